@@ -4,13 +4,16 @@ Creates animated shapes that follow user-drawn paths with visual editor.
 """
 
 from .nodes.FL_PathAnimator import FL_PathAnimator
+from .nodes.synthetic_paths import FL_SyntheticPaths
 
 NODE_CLASS_MAPPINGS = {
     "FL_PathAnimator": FL_PathAnimator,
+    "FL_SyntheticPaths": FL_SyntheticPaths,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "FL_PathAnimator": "FL Path Animator",
+    "FL_SyntheticPaths": "FL Synthetic Paths",
 }
 
 WEB_DIRECTORY = "./web"
@@ -0,0 +1,210 @@
+"""
+Benchmark suite for the path animator.
+
+Renders a baseline animation and sweeps one setting at a time away from it:
+resolution, frame count, path count, points per path, and the blur, trail and
+rotation effects. The paths come from the seeded synthetic generator (pencil
+strokes, orbits, arcs and pins with mixed timing and visibility). Each case reports frames per second, megapixels per second
+and peak RSS. Every case runs in a fresh subprocess with the result caches
+disabled, so it measures the whole render and the peak RSS is its own.
+
+Results are written as JSON along with the git commit and library versions.
+Pass an earlier results file with --compare to print the speedup of every
+case. Single renders vary by several percent, so use --repeats 3 or more when
+comparing commits.
+
+Usage:
+    python benchmarks/benchmark_suite.py --output results.json
+    python benchmarks/benchmark_suite.py --quick --axes resolution paths
+    python benchmarks/benchmark_suite.py --output new.json --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = {
+    'width': 512, 'height': 512, 'frames': 48, 'paths': 16, 'points': 64,
+    'shape': 'star', 'shape_size': 24, 'blur_radius': 0.0, 'trail_length': 0.0, 'rotation_speed': 0.0,
+}
+
+EFFECTS = {
+    'none': {},
+    'blur': {'blur_radius': 4.0},
+    'trail': {'trail_length': 0.5},
+    'rotation': {'rotation_speed': 90.0},
+    'all': {'blur_radius': 4.0, 'trail_length': 0.5, 'rotation_speed': 90.0},
+}
+
+# Values per axis, full sweep and --quick sweep
+AXES = {
+    'resolution': ([512, 1024, 2048, 4096], [512, 1024]),
+    'frames': ([1, 30, 120, 500], [1, 30, 120]),
+    'paths': ([1, 10, 100, 1000], [1, 10, 100]),
+    'points': ([2, 100, 1000, 10000], [2, 100, 1000]),
+    'effects': (list(EFFECTS), list(EFFECTS)),
+}
+
+
+def case_settings(axis, value):
+    """The baseline with one axis set to value"""
+    settings = dict(BASELINE)
+    if axis == 'resolution':
+        settings['width'] = settings['height'] = value
+    elif axis == 'effects':
+        settings.update(EFFECTS[value])
+    else:
+        settings[axis] = value
+    return settings
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where resource is unavailable (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def run_case(settings, engine, threads, repeats, seed):
+    """Render one case in this process and return its timings"""
+    os.environ['FL_PATH_ANIMATOR_CACHE_MB'] = '0'
+    os.environ['FL_PATH_ANIMATOR_COVERAGE_CACHE_MB'] = '0'
+    sys.path.insert(0, ROOT)
+    from nodes.FL_PathAnimator import FL_PathAnimator
+    from nodes.synthetic_paths import generate_paths_data
+
+    kwargs = dict(frame_width=settings['width'], frame_height=settings['height'], frame_count=settings['frames'],
+                  shape=settings['shape'], shape_size=settings['shape_size'], shape_color='white',
+                  bg_color='black', blur_radius=settings['blur_radius'], trail_length=settings['trail_length'],
+                  rotation_speed=settings['rotation_speed'], render_engine=engine, num_threads=threads,
+                  paths_data=generate_paths_data(seed, settings['width'], settings['height'], settings['paths'],
+                                                 settings['points']))
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = FL_PathAnimator().animate_paths(**kwargs)
+        times.append(time.perf_counter() - start)
+        del result
+
+    seconds = min(times)
+    megapixels = settings['frames'] * settings['width'] * settings['height'] / 1e6
+    return {
+        'seconds': seconds,
+        'fps': settings['frames'] / seconds,
+        'megapixels_per_second': megapixels / seconds,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import numpy
+    import torch
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'torch': torch.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, previous_path):
+    """Print the fps of every case next to the same case in an earlier results file"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(case['axis'], str(case['value'])): case for case in previous['results']}
+    print(f"\nCompared with {previous_path} (commit {previous.get('environment', {}).get('commit')})")
+    print(f"{'axis':<12}{'value':>10}{'old fps':>12}{'new fps':>12}{'speedup':>10}")
+    for case in results:
+        old = before.get((case['axis'], str(case['value'])))
+        if old is None or 'fps' not in old or 'fps' not in case:
+            continue
+        print(f"{case['axis']:<12}{str(case['value']):>10}{old['fps']:>12.2f}{case['fps']:>12.2f}"
+              f"{case['fps'] / old['fps']:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--axes", nargs='+', choices=list(AXES), default=list(AXES))
+    parser.add_argument("--quick", action='store_true', help="Smaller sweeps that fit in a few GB of RAM")
+    parser.add_argument("--render-engine", default='pil')
+    parser.add_argument("--workers", type=int, default=0, help="0 uses every CPU core")
+    parser.add_argument("--repeats", type=int, default=1, help="Renders per case, the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before a case is abandoned")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        # Child process: render one case and print its result as JSON
+        print(json.dumps(run_case(json.loads(args.run_case), args.render_engine, args.workers,
+                                  args.repeats, args.seed)))
+        return
+
+    print(f"{'axis':<12}{'value':>10}{'seconds':>10}{'fps':>10}{'MP/s':>10}{'peak MB':>10}")
+    results = []
+    for axis in args.axes:
+        for value in AXES[axis][1 if args.quick else 0]:
+            settings = case_settings(axis, value)
+            case = {'axis': axis, 'value': value, 'settings': settings}
+            command = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(settings),
+                       "--render-engine", args.render_engine, "--workers", str(args.workers),
+                       "--repeats", str(args.repeats), "--seed", str(args.seed)]
+            try:
+                child = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+                if child.returncode == 0:
+                    case.update(json.loads(child.stdout.strip().splitlines()[-1]))
+                else:
+                    case['error'] = (child.stderr.strip().splitlines() or [f"exit code {child.returncode}"])[-1]
+            except subprocess.TimeoutExpired:
+                case['error'] = f"timed out after {args.timeout:.0f}s"
+            results.append(case)
+
+            if 'error' in case:
+                print(f"{axis:<12}{str(value):>10}  failed: {case['error']}")
+            else:
+                peak = 'n/a' if case['peak_rss_mb'] is None else f"{case['peak_rss_mb']:.0f}"
+                print(f"{axis:<12}{str(value):>10}{case['seconds']:>10.3f}{case['fps']:>10.2f}"
+                      f"{case['megapixels_per_second']:>10.1f}{peak:>10}")
+
+    report = {
+        'environment': environment(),
+        'baseline': BASELINE,
+        'render_engine': args.render_engine,
+        'workers': args.workers,
+        'repeats': args.repeats,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Golden-output equivalence check for the path animator.
+
+Renders generated workloads (nodes/synthetic_paths.py) with the original
+animate_paths (benchmarks/reference_animator.py, a verbatim copy of the node
+before the rendering rework) and with every configuration of the current node:
+the pil, sprite and SDF engines, the thread and process pools, chunked
+streaming, memmap output, the torch blur, float16 and mask-only rendering.
+Workloads range from 160x128 to 1920x1080 frames and from no blur to radius 12,
+so the region blur, its full-frame fallback and the torch box blur all run.
+Every variant is checked against the reference for:
+
+  - images: per-pixel difference within the variant's tolerance; the pixels
+    beyond it are counted per frame against an edge allowance
+  - masks: the same, plus the per-frame mask coverage counts (pixels above one
+    half), exactly for the exact variants and within an edge allowance for the
+    approximate ones
+  - coordinates: the WAN ATI coordinate JSON, always exactly
+
+Edge allowances are absolute pixel counts: the pixels within a band a pixel
+or two wide along the shapes' outlines, as the original node draws them
+without blur or trail, widened with the blur's reach. With a trail, the
+outlines of the earlier frames still showing add up. Approximate engines only
+differ at the edges, so a difference anywhere else fails however large the frame.
+
+The original node's mask is the red channel of the image, the current one is
+the shape coverage, fill and border together. The reference masks therefore
+come from a second render with a white fill, a black background and a white
+border, whose red channel is the shape coverage, and the variants render with
+mask_mode='effects', which blurs and trails the mask like the image.
+
+Failures list the differing frames and write diff images (reference, variant
+and the difference amplified 8x, side by side) to --diff-dir.
+
+--record freezes the reference outputs in a directory, and --golden compares
+the variants against those files instead of rendering the reference again.
+
+Usage:
+    python benchmarks/equivalence_check.py
+    python benchmarks/equivalence_check.py --variants sdf sprite --workloads 24
+    python benchmarks/equivalence_check.py --record golden/
+    python benchmarks/equivalence_check.py --golden golden/ --variants pil threads
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+# Variants differ from each other in inputs the result cache ignores, so caching is off
+os.environ['FL_PATH_ANIMATOR_CACHE_MB'] = '0'
+os.environ['FL_PATH_ANIMATOR_COVERAGE_CACHE_MB'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nodes.FL_PathAnimator import FL_PathAnimator
+from nodes.frame_renderer import gaussian_blur_support
+from nodes.synthetic_paths import generate_paths_data
+from reference_animator import FL_PathAnimator as ReferenceAnimator
+
+# pixel: largest difference that counts as equal; edge: how far in pixels from a shape's outline pixels
+# may differ by more; blur_edge: how far further per pixel of blur reach; coverage: how far from an
+# outline mask coverage may differ. The allowances are the pixel counts of those bands (all 0 = exact).
+Tolerance = namedtuple('Tolerance', 'pixel edge blur_edge coverage')
+EXACT = Tolerance(0.0, 0.0, 0.0, 0.0)
+
+# Colors whose red channel is the shape coverage in the original node
+MASK_COLORS = dict(shape_color='white', bg_color='black', border_color='white')
+
+# The current node's inputs every variant starts from
+BASE = dict(render_engine='pil', num_threads=1, parallel_backend='thread', blur_engine='pil',
+            output_mode='memory', render_mode='full', output_precision='float32', mask_mode='effects')
+
+# Variant name -> (inputs changed from BASE, tolerance, tolerance with a trail); 'chunked' streams through
+# iter_frames. The trail normalizes every frame by its maximum, which lifts the small differences of a
+# faint, heavily blurred frame over the whole blur, so with a trail the band spans most of the blur's reach. The
+# approximate bands are about twice the widest seen over 100 generated workloads.
+VARIANTS = {
+    'pil': ({}, EXACT, EXACT),
+    'threads': ({'num_threads': 4}, EXACT, EXACT),
+    'process': ({'num_threads': 2, 'parallel_backend': 'process'}, EXACT, EXACT),
+    'chunked': ({}, EXACT, EXACT),
+    'memmap': ({'output_mode': 'memmap'}, EXACT, EXACT),
+    'mask_only': ({'render_mode': 'mask_only'}, EXACT, EXACT),
+    'float16': ({'output_precision': 'float16'}, Tolerance(3e-3, 0.0, 0.0, 0.0),
+                Tolerance(3e-3, 0.0, 0.0, 0.05)),
+    'torch_blur': ({'blur_engine': 'torch'}, Tolerance(8 / 255, 0.0, 0.07, 0.25),
+                   Tolerance(8 / 255, 0.0, 0.7, 1.0)),
+    'sprite': ({'render_engine': 'sprite'}, Tolerance(8 / 255, 0.5, 0.25, 0.3),
+               Tolerance(8 / 255, 0.5, 0.7, 0.3)),
+    'sdf': ({'render_engine': 'sdf'}, Tolerance(8 / 255, 1.0, 0.6, 0.6),
+            Tolerance(8 / 255, 1.0, 0.7, 2.0)),
+}
+
+# Frames streamed per chunk by the chunked variant, small enough to split every workload
+CHUNK_FRAMES = 5
+
+
+def make_workload(index, seed):
+    """Animation inputs of one generated workload, the original node's inputs only"""
+    rng = random.Random(seed * 1000 + index)
+    width, height = rng.choice([(160, 128), (256, 192), (320, 240), (1280, 720), (1920, 1080)])
+    large = width * height > 1_000_000
+    canvas = rng.choice([(width, height), (512, 512), (640, 360)])
+    shape_size = rng.randint(60, 200) if rng.random() < 0.25 else rng.randint(4, 40)
+    return dict(
+        frame_width=width, frame_height=height, frame_count=rng.choice([1, 7] if large else [1, 7, 24]),
+        shape=rng.choice(['circle', 'square', 'triangle', 'hexagon', 'star']), shape_size=shape_size,
+        shape_color=rng.choice(['white', '255,80,0', '#40A0FF']), bg_color=rng.choice(['black', '#203040']),
+        blur_radius=rng.choice([0.0, 0.0, 1.5, 4.0, 8.0, 12.0]), trail_length=rng.choice([0.0, 0.0, 0.5]),
+        rotation_speed=rng.choice([0.0, 45.0]), border_width=rng.choice([0, 0, 2]), border_color='yellow',
+        start_time_percent=rng.choice([0.0, 0.0, 25.0]), end_time_percent=rng.choice([100.0, 100.0, 80.0]),
+        override_path_length=rng.choice([-1, -1, 300]), path_length_multiplier=rng.choice([1.0, 1.0, 1.5]),
+        paths_data=generate_paths_data(seed * 1000 + index, canvas[0], canvas[1], rng.randint(1, 24),
+                                       rng.choice([2, 20, 200])),
+    )
+
+
+def render_reference(workload):
+    """(images, masks, coordinates) of the original node, as float32 NumPy arrays"""
+    images, _, coordinates = ReferenceAnimator().animate_paths(**workload)
+    _, masks, _ = ReferenceAnimator().animate_paths(**{**workload, **MASK_COLORS})
+    return images.numpy(), masks.numpy(), coordinates
+
+
+def render(workload, variant):
+    """(images, masks, coordinates) of a workload rendered by a variant, as float32 NumPy arrays"""
+    inputs = {**workload, **BASE, **VARIANTS[variant][0]}
+    if variant == 'chunked':
+        del inputs['output_mode']
+        render_mode = inputs.pop('render_mode')
+        images, masks = [], []
+        node = FL_PathAnimator()
+        for _, chunk_images, chunk_masks in node.iter_frames(**inputs, render_mode=render_mode,
+                                                             chunk_size=CHUNK_FRAMES):
+            images.append(chunk_images.float().numpy().copy())
+            masks.append(chunk_masks.float().numpy().copy())
+        coordinates = node.prepare_animation(**inputs)['coordinates']
+        return np.concatenate(images), np.concatenate(masks), coordinates
+
+    images, masks, coordinates = FL_PathAnimator().animate_paths(**inputs)
+    return images.float().numpy(), masks.float().numpy(), coordinates
+
+
+def shape_counts(workload):
+    """Per frame, the number of shapes drawn in it"""
+    visible = FL_PathAnimator().prepare_animation(**workload)['renderer'].visible
+    return visible.sum(axis=1).astype(np.float64)
+
+
+def outline_lengths(workload):
+    """
+    Per frame, the length in pixels of the shapes' outlines as the original node
+    draws them without blur or trail: the color changes between horizontally and
+    vertically neighboring pixels. Overlapping shapes and shapes partly off the
+    frame count only the outline that shows.
+    """
+    images, _, _ = ReferenceAnimator().animate_paths(**{**workload, 'blur_radius': 0.0, 'trail_length': 0.0})
+    images = images.numpy()
+    return ((images[:, 1:] != images[:, :-1]).any(axis=-1).sum(axis=(1, 2)) +
+            (images[:, :, 1:] != images[:, :, :-1]).any(axis=-1).sum(axis=(1, 2))).astype(np.float64)
+
+
+def trail_sum(values, trail_length):
+    """Per frame, the sum of values over the frames whose trail has not yet faded below one level"""
+    if trail_length <= 0:
+        return values
+    reach = min(len(values), math.ceil(math.log(1 / 255) / math.log(min(trail_length, 0.99))) + 1)
+    return np.convolve(values, np.ones(reach))[:len(values)]
+
+
+def edge_area(outlines, shapes, band):
+    """Number of pixels within band pixels of an outline outlines pixels long, spread over shapes shapes"""
+    return np.floor(2 * band * outlines + math.pi * band * band * shapes)
+
+
+def coverage_counts(masks):
+    return (masks > 0.5).sum(axis=(1, 2))
+
+
+def compare(reference, candidate, tolerance, outlines, shapes, blur_reach, check_images=True):
+    """
+    Compare a variant's outputs with the reference.
+
+    Args:
+        outlines: Per-frame outline length of the shapes that show in the frame (outline_lengths)
+        shapes: Per-frame number of those shapes (shape_counts)
+        blur_reach: How far in pixels the workload's blur spreads an edge
+
+    Returns:
+        (problems, bad_frames): descriptions of every failed check, and the indices of
+        the frames that fail a per-frame check
+    """
+    ref_images, ref_masks, ref_coordinates = reference
+    images, masks, coordinates = candidate
+    problems = []
+    if images.shape != ref_images.shape or masks.shape != ref_masks.shape:
+        return [f"shape {images.shape} / {masks.shape}, expected {ref_images.shape} / {ref_masks.shape}"], []
+
+    bad = np.zeros(len(ref_masks), dtype=bool)
+    allowed = edge_area(outlines, shapes, tolerance.edge + tolerance.blur_edge * blur_reach)
+    outputs = ((ref_images, images, 'image'), (ref_masks, masks, 'mask')) if check_images else \
+        ((ref_masks, masks, 'mask'),)
+    for ref, out, name in outputs:
+        difference = np.abs(out - ref).reshape(len(ref), -1)
+        if ref.ndim == 4:
+            difference = difference.reshape(len(ref), -1, ref.shape[-1]).max(axis=-1)
+        beyond = (difference > tolerance.pixel + 1e-6).sum(axis=1)
+        failed = beyond > allowed
+        if failed.any():
+            frame = int(np.argmax(beyond - allowed))
+            problems.append(f"{name}: {failed.sum()} frames beyond tolerance, max difference "
+                            f"{difference.max():.4f}; frame {frame} has {beyond[frame]} pixels beyond "
+                            f"{tolerance.pixel:.4f}, {allowed[frame]:.0f} allowed")
+            bad |= failed
+
+    ref_counts, counts = coverage_counts(ref_masks), coverage_counts(masks)
+    allowed = edge_area(outlines, shapes, tolerance.coverage)
+    failed = np.abs(counts - ref_counts) > allowed
+    if failed.any():
+        frame = int(np.argmax(np.abs(counts - ref_counts) - allowed))
+        problems.append(f"mask coverage: {failed.sum()} frames differ, frame {frame} covers "
+                        f"{counts[frame]} pixels instead of {ref_counts[frame]}, {allowed[frame]:.0f} allowed")
+        bad |= failed
+
+    if coordinates != ref_coordinates:
+        problems.append("coordinates: WAN ATI JSON differs")
+    return problems, np.flatnonzero(bad).tolist()
+
+
+def write_diff_images(directory, name, reference, candidate, frames, masks=False):
+    """Save reference | variant | 8x difference strips of the given frames, of the images or the masks"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for frame in frames:
+        if masks:
+            ref, out = (np.repeat(outputs[1][frame][..., None], 3, axis=-1) for outputs in (reference, candidate))
+        else:
+            ref, out = reference[0][frame], candidate[0][frame]
+        strip = np.concatenate([ref, out, np.clip(np.abs(out - ref) * 8, 0, 1)], axis=1)
+        path = os.path.join(directory, f"{name}_frame{frame:04d}.png")
+        Image.fromarray(np.rint(strip * 255).astype(np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def save_golden(path, outputs):
+    images, masks, coordinates = outputs
+    np.savez_compressed(path, images=images, masks=masks, coordinates=np.array(coordinates))
+
+
+def load_golden(path):
+    with np.load(path) as data:
+        return data['images'], data['masks'], str(data['coordinates'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--workloads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", help="Write the reference outputs to this directory and exit")
+    parser.add_argument("--golden", help="Compare against reference outputs recorded with --record")
+    parser.add_argument("--diff-dir", default="equivalence_diffs", help="Where to write diff images")
+    parser.add_argument("--max-diff-frames", type=int, default=4, help="Diff images per failure")
+    args = parser.parse_args()
+
+    workloads = [make_workload(index, args.seed) for index in range(args.workloads)]
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        for index, workload in enumerate(workloads):
+            save_golden(os.path.join(args.record, f"workload_{index:03d}.npz"), render_reference(workload))
+        with open(os.path.join(args.record, "workloads.json"), 'w') as f:
+            json.dump({'seed': args.seed, 'workloads': workloads}, f)
+        print(f"Recorded {len(workloads)} reference renders in {args.record}")
+        return
+
+    if args.golden:
+        # The recorded inputs, in case the generator has changed since
+        with open(os.path.join(args.golden, "workloads.json")) as f:
+            workloads = json.load(f)['workloads']
+
+    failures = 0
+    for index, workload in enumerate(workloads):
+        if args.golden:
+            reference = load_golden(os.path.join(args.golden, f"workload_{index:03d}.npz"))
+        else:
+            reference = render_reference(workload)
+        summary = (f"workload {index}: {workload['frame_count']} frames {workload['frame_width']}x"
+                   f"{workload['frame_height']} {workload['shape']}, blur {workload['blur_radius']}, "
+                   f"trail {workload['trail_length']}")
+        print(summary)
+        # With a trail, the shapes of the frames before still show
+        outlines = trail_sum(outline_lengths(workload), workload['trail_length'])
+        shapes = trail_sum(shape_counts(workload), workload['trail_length'])
+        blur_reach = gaussian_blur_support(workload['blur_radius']) if workload['blur_radius'] > 0 else 0
+
+        for variant in args.variants:
+            tolerance = VARIANTS[variant][2 if workload['trail_length'] > 0 else 1]
+            candidate = render(workload, variant)
+            # Mask-only renders hand out the masks as the image
+            mask_only = variant == 'mask_only'
+            problems, frames = compare(reference, candidate, tolerance, outlines, shapes, blur_reach,
+                                       check_images=not mask_only)
+            if not problems:
+                print(f"  {variant:<12} ok")
+                continue
+
+            failures += 1
+            print(f"  {variant:<12} FAILED")
+            for problem in problems:
+                print(f"    {problem}")
+            if frames:
+                shown = frames[:args.max_diff_frames]
+                print(f"    differing frames: {frames[:20]}{' ...' if len(frames) > 20 else ''}")
+                for path in write_diff_images(args.diff_dir, f"workload{index:03d}_{variant}", reference,
+                                              candidate, shown, masks=mask_only):
+                    print(f"    wrote {path}")
+
+    print(f"\n{failures} failed comparisons" if failures else "\nAll variants match the reference")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
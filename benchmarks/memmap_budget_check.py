@@ -0,0 +1,140 @@
+"""
+Memmap output check for output_mode='auto'.
+
+Sets FL_PATH_ANIMATOR_MEMORY_BUDGET_MB far below the size of the rendered
+output, renders with output_mode='auto' and checks that:
+
+  - the IMAGE and MASK tensors are backed by memmap files (their memory is a
+    file mapping in the memmap directory, or, without /proc/self/maps, the
+    node logged the memmap render)
+  - they equal the same animation rendered with output_mode='memory'
+  - no memmap file is left in the directory once the render returns, nor
+    after the tensors are released
+
+The files go to a fresh temporary directory, removed at the end. The result
+caches are disabled so both renders draw their frames. Exits non-zero when a
+check fails.
+
+Usage:
+    python benchmarks/memmap_budget_check.py
+    python benchmarks/memmap_budget_check.py --budget-mb 64 --width 1920 --height 1080 --frames 60
+"""
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def mapped_files():
+    """{(start, end): path} of the file mappings of this process, None without /proc/self/maps"""
+    try:
+        with open('/proc/self/maps') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    mappings = {}
+    for line in lines:
+        fields = line.split(maxsplit=5)
+        if len(fields) == 6:
+            start, end = (int(address, 16) for address in fields[0].split('-'))
+            mappings[(start, end)] = fields[5]
+    return mappings
+
+
+def backing_file(tensor, mappings):
+    """Path of the file mapping that holds tensor's memory, or None"""
+    address = tensor.untyped_storage().data_ptr()
+    for (start, end), path in mappings.items():
+        if start <= address < end:
+            return path
+    return None
+
+
+class MessageLog(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-mb", type=int, default=16)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Read when the node modules are imported
+    os.environ['FL_PATH_ANIMATOR_MEMORY_BUDGET_MB'] = str(args.budget_mb)
+    os.environ['FL_PATH_ANIMATOR_CACHE_MB'] = '0'
+    os.environ['FL_PATH_ANIMATOR_COVERAGE_CACHE_MB'] = '0'
+    directory = tempfile.mkdtemp(prefix="fl_path_animator_check_")
+    # Outside ComfyUI the memmap directory lives under the system temp directory
+    tempfile.tempdir = directory
+    sys.path.insert(0, ROOT)
+    import torch
+    from nodes.FL_PathAnimator import FL_PathAnimator
+    from nodes.memmap_output import MEMMAP_PREFIX, get_memmap_directory
+    from nodes.synthetic_paths import generate_paths_data
+
+    memmap_directory = get_memmap_directory()
+    log = MessageLog()
+    logging.getLogger("FL_PathAnimator").addHandler(log)
+
+    def leftover_files():
+        return [name for name in os.listdir(memmap_directory) if name.startswith(MEMMAP_PREFIX)]
+
+    kwargs = dict(frame_width=args.width, frame_height=args.height, frame_count=args.frames, shape='star',
+                  shape_size=32, shape_color='white', bg_color='black', blur_radius=2.0, trail_length=0.5,
+                  rotation_speed=45.0, paths_data=generate_paths_data(args.seed, args.width, args.height, 12, 64))
+    output_mb = args.frames * args.width * args.height * 4 * 4 / 2 ** 20
+    print(f"{args.frames} frames at {args.width}x{args.height}: {output_mb:.0f} MB of output, "
+          f"budget {args.budget_mb} MB")
+
+    failures = []
+    try:
+        images, masks, _ = FL_PathAnimator().animate_paths(**kwargs, output_mode='auto')
+
+        mappings = mapped_files()
+        if mappings is not None:
+            for name, tensor in (("IMAGE", images), ("MASK", masks)):
+                path = backing_file(tensor, mappings)
+                if path is None or not path.startswith(memmap_directory):
+                    failures.append(f"{name} is not backed by a memmap file (mapping: {path})")
+        elif not any("into memmap files" in message for message in log.messages):
+            failures.append("the render did not use memmap output")
+
+        if leftover_files():
+            failures.append(f"memmap files left after the render: {leftover_files()}")
+
+        reference_images, reference_masks, _ = FL_PathAnimator().animate_paths(**kwargs, output_mode='memory')
+        if not (torch.equal(images, reference_images) and torch.equal(masks, reference_masks)):
+            failures.append("memmap output differs from the in-memory render")
+
+        del images, masks, reference_images, reference_masks
+        gc.collect()
+        if leftover_files():
+            failures.append(f"memmap files left after releasing the outputs: {leftover_files()}")
+    finally:
+        tempfile.tempdir = None
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if not failures:
+        print("memmap-backed, identical to the in-memory render, no files left")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
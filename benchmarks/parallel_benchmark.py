@@ -0,0 +1,78 @@
+"""
+Parallel rendering benchmark.
+
+Renders the same animation serially, on the thread pool and on the process pool
+(shared memory output) and reports wall time, frames per second and whether
+every mode matches the serial output.
+
+Usage:
+    python benchmarks/parallel_benchmark.py --width 4096 --height 4096 --frames 24 --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nodes.FL_PathAnimator import FL_PathAnimator
+
+
+def make_paths_data(width, height, num_paths, seed):
+    """Random closed orbits on the output canvas"""
+    rng = random.Random(seed)
+    paths = []
+    for path_idx in range(num_paths):
+        cx, cy = rng.uniform(0.2, 0.8) * width, rng.uniform(0.2, 0.8) * height
+        rx, ry = rng.uniform(0.05, 0.2) * width, rng.uniform(0.05, 0.2) * height
+        points = [{'x': cx + rx * math.cos(2 * math.pi * i / 20), 'y': cy + ry * math.sin(2 * math.pi * i / 20)}
+                  for i in range(21)]
+        paths.append({'id': f'path_{path_idx}', 'points': points, 'startTime': 0.0, 'endTime': 1.0})
+    return json.dumps({'paths': paths, 'canvas_size': {'width': width, 'height': height}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=2048)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--frames", type=int, default=24)
+    parser.add_argument("--paths", type=int, default=64)
+    parser.add_argument("--shape", default='star')
+    parser.add_argument("--shape-size", type=int, default=48)
+    parser.add_argument("--blur-radius", type=float, default=2.0)
+    parser.add_argument("--render-engine", default='pil')
+    parser.add_argument("--workers", type=int, default=0, help="0 uses every CPU core")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    kwargs = dict(frame_width=args.width, frame_height=args.height, frame_count=args.frames,
+                  shape=args.shape, shape_size=args.shape_size, shape_color='white', bg_color='black',
+                  blur_radius=args.blur_radius, rotation_speed=90.0, render_engine=args.render_engine,
+                  paths_data=make_paths_data(args.width, args.height, args.paths, args.seed))
+    workers = args.workers or os.cpu_count() or 1
+
+    print(f"{args.frames} frames at {args.width}x{args.height}, {args.paths} {args.shape} paths, "
+          f"blur {args.blur_radius}, {args.render_engine} engine, {workers} workers")
+    print(f"{'mode':<10}{'seconds':>10}{'fps':>10}{'identical':>12}")
+
+    reference = None
+    for mode, num_threads, backend in (("serial", 1, 'thread'),
+                                       ("thread", workers, 'thread'),
+                                       ("process", workers, 'process')):
+        start = time.perf_counter()
+        images = FL_PathAnimator().animate_paths(**kwargs, num_threads=num_threads, parallel_backend=backend)[0]
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = images
+        print(f"{mode:<10}{elapsed:>10.3f}{args.frames / elapsed:>10.2f}{str(torch.equal(images, reference)):>12}")
+        del images
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+SDF engine pixel check against draw_shape.
+
+Draws random cases of three shapes on a 160x120 frame, some of them partly off
+the frame, once with FL_PathAnimator.draw_shape (PIL) and once with the batched
+SDF rasterizer. Shape, size (4 to 120), rotation and border width (0, 1 or 3)
+vary per case. Checks that:
+
+  - every differing pixel is an edge pixel: within EDGE_DISTANCE pixels of a
+    shape's outline or fill / border boundary, as PIL draws that shape alone
+  - the absolute difference summed over a case, per pixel of that edge band,
+    is at most --max-edge-diff of full scale
+
+The anti-aliased SDF edges and PIL's hard edges differ by design, by up to
+about one pixel across an outline. The band is 2 * EDGE_DISTANCE + 1 pixels
+wide, so the difference per band pixel stays near 1/7 however much of the
+frame is edge; squares, whose sides can shift a whole pixel row, come
+closest (at most 0.133 over seeds 0 to 47). The band keeps its full width
+where an outline leaves the frame, so slivers of shapes cut by the frame
+border are measured like the rest. Exits non-zero when a case fails.
+
+Usage:
+    python benchmarks/sdf_equivalence.py
+    python benchmarks/sdf_equivalence.py --cases 1000 --seed 3
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nodes.FL_PathAnimator import FL_PathAnimator
+from nodes.sdf_render import render_sdf_frames
+
+SHAPES = ('circle', 'square', 'triangle', 'hexagon', 'star')
+FRAME_WIDTH, FRAME_HEIGHT = 160, 120
+SHAPES_PER_CASE = 3
+FILL = (255, 255, 255)
+BACKGROUND = (0, 0, 0)
+BORDER = (255, 0, 0)
+# Differing pixels may lie this far from an outline (pixels, Chebyshev distance)
+EDGE_DISTANCE = 3
+# Edge labels are drawn with this margin around the frame, so outlines just off the frame count
+EDGE_MARGIN = 8
+
+
+def random_case(rng):
+    shape = rng.choice(SHAPES)
+    size = rng.randint(4, 120)
+    border_width = rng.choice([0, 0, 1, 3])
+    if border_width * 2 >= size:
+        border_width = 0
+    positions = np.array([[[rng.uniform(-20, FRAME_WIDTH + 20), rng.uniform(-20, FRAME_HEIGHT + 20)]
+                           for _ in range(SHAPES_PER_CASE)]])
+    rotations = np.array([[rng.uniform(-400, 400) for _ in range(SHAPES_PER_CASE)]])
+    return {'shape': shape, 'size': size, 'border_width': border_width, 'positions': positions,
+            'rotations': rotations}
+
+
+def draw_both(node, case):
+    """(PIL, SDF) renders of one case as (H, W, 3) uint8 arrays"""
+    image = Image.new("RGB", (FRAME_WIDTH, FRAME_HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    for (x, y), rotation in zip(case['positions'][0].tolist(), case['rotations'][0].tolist()):
+        node.draw_shape(draw, case['shape'], x, y, case['size'], rotation, FILL, case['border_width'], BORDER)
+
+    sdf = render_sdf_frames(case['positions'], case['rotations'], np.ones((1, SHAPES_PER_CASE), dtype=bool),
+                            FRAME_WIDTH, FRAME_HEIGHT, case['shape'], case['size'], FILL, BACKGROUND,
+                            case['border_width'], BORDER)[0]
+    return np.asarray(image), sdf
+
+
+def edge_pixels(node, case):
+    """
+    Pixels within EDGE_DISTANCE of any shape's outline or fill / border boundary.
+    Each shape is drawn alone, so outlines hidden under an overlapping shape still count.
+
+    Returns:
+        (edges, band_size): (H, W) bool edge pixels of the frame, and the number of edge
+        pixels in the frame grown by EDGE_DISTANCE on every side
+    """
+    size = (FRAME_WIDTH + 2 * EDGE_MARGIN, FRAME_HEIGHT + 2 * EDGE_MARGIN)
+    window = 2 * EDGE_DISTANCE + 1
+    crop = EDGE_MARGIN - EDGE_DISTANCE
+    band = np.zeros((FRAME_HEIGHT + 2 * EDGE_DISTANCE, FRAME_WIDTH + 2 * EDGE_DISTANCE), dtype=bool)
+    for (x, y), rotation in zip(case['positions'][0].tolist(), case['rotations'][0].tolist()):
+        labels = Image.new("L", size, 0)
+        node.draw_shape(ImageDraw.Draw(labels), case['shape'], x + EDGE_MARGIN, y + EDGE_MARGIN, case['size'],
+                        rotation, 1, case['border_width'], 2)
+        uneven = (np.asarray(labels.filter(ImageFilter.MaxFilter(window)))
+                  != np.asarray(labels.filter(ImageFilter.MinFilter(window))))
+        band |= uneven[crop:-crop, crop:-crop]
+    return band[EDGE_DISTANCE:-EDGE_DISTANCE, EDGE_DISTANCE:-EDGE_DISTANCE], int(band.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-edge-diff", type=float, default=0.2,
+                        help="Per edge band pixel, as a fraction of full scale")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    node = FL_PathAnimator()
+    worst_edge = 0.0
+    failures = 0
+    for index in range(args.cases):
+        case = random_case(rng)
+        pil, sdf = draw_both(node, case)
+        difference = np.abs(pil.astype(np.int16) - sdf.astype(np.int16))
+        edges, band_size = edge_pixels(node, case)
+        # Mean over the color channels, so a full-scale difference in every channel counts as one
+        edge_diff = difference.sum() / (255 * difference.shape[-1] * max(band_size, 1))
+        worst_edge = max(worst_edge, edge_diff)
+        off_edge = int(((difference > 0).any(axis=-1) & ~edges).sum())
+
+        if edge_diff > args.max_edge_diff or off_edge:
+            failures += 1
+            print(f"case {index}: {case['shape']} size {case['size']} border {case['border_width']}: "
+                  f"difference {edge_diff:.4f} per edge pixel, {off_edge} differing pixels off the edges")
+
+    print(f"{args.cases} cases, worst difference per edge pixel {worst_edge:.4f} (limit {args.max_edge_diff}), "
+          f"{failures} failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
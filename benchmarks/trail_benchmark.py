@@ -0,0 +1,88 @@
+"""
+Trail accumulator benchmark.
+
+Compares the original per-frame trail (add, global max, divide, clone and clamp,
+each allocating a full frame) with FL_PathAnimator.apply_trail, which works in
+place on the output buffer with one reused scratch frame. Reports wall time and
+the bytes allocated by torch, and checks both produce identical frames.
+
+Usage:
+    python benchmarks/trail_benchmark.py --width 1280 --height 720 --frames 60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+from torch.profiler import profile, ProfilerActivity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nodes.FL_PathAnimator import FL_PathAnimator
+
+
+def legacy_trail(frames, trail_length):
+    """The trail loop as animate_paths ran it before the in-place accumulator"""
+    outputs = []
+    previous_output = None
+    for frame in frames:
+        image_tensor = frame.unsqueeze(0)
+        if trail_length > 0 and previous_output is not None:
+            image_tensor = image_tensor + trail_length * previous_output
+            max_val = image_tensor.max()
+            if max_val > 0:
+                image_tensor = image_tensor / max_val
+        previous_output = image_tensor.clone()
+        image_tensor = torch.clamp(image_tensor, 0.0, 1.0)
+        outputs.append(image_tensor)
+    return outputs
+
+
+def streaming_trail(frames, trail_length):
+    """The in-place accumulator writing into the (preallocated) frame stack"""
+    return FL_PathAnimator().apply_trail(frames, trail_length)
+
+
+def measure(fn, frames, trail_length):
+    """Run fn under the torch profiler, return (seconds, allocated bytes, allocation count, result)"""
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        start = time.perf_counter()
+        result = fn(frames, trail_length)
+        elapsed = time.perf_counter() - start
+    allocations = [e.self_cpu_memory_usage for e in prof.events() if e.self_cpu_memory_usage > 0]
+    return elapsed, sum(allocations), len(allocations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--trail-length", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(args.seed)
+    # Sparse bright shapes on a dark background, like rendered frames
+    source = (torch.rand((args.frames, args.height, args.width, 3), generator=generator) > 0.98).float()
+
+    legacy_time, legacy_bytes, legacy_count, legacy = measure(legacy_trail, source.clone(), args.trail_length)
+    stream_time, stream_bytes, stream_count, stream = measure(streaming_trail, source.clone(), args.trail_length)
+
+    identical = torch.equal(torch.cat(legacy, dim=0), stream)
+    frame_mb = args.width * args.height * 3 * 4 / 2 ** 20
+
+    print(f"{args.frames} frames at {args.width}x{args.height} ({frame_mb:.1f} MB per frame), "
+          f"trail_length={args.trail_length}")
+    print(f"{'engine':<12}{'seconds':>10}{'allocs':>10}{'allocated MB':>16}{'MB / frame':>14}")
+    for name, seconds, count, allocated in (("legacy", legacy_time, legacy_count, legacy_bytes),
+                                            ("streaming", stream_time, stream_count, stream_bytes)):
+        print(f"{name:<12}{seconds:>10.3f}{count:>10}{allocated / 2 ** 20:>16.1f}"
+              f"{allocated / 2 ** 20 / args.frames:>14.2f}")
+    print(f"identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,82 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import torch
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image
 import math
 import json
 import logging
 
+from .frame_renderer import FrameRenderer
+from .process_render import ProcessRenderPool, shared_empty
+from .torch_blur import blur_frames
+from .memmap_output import memmap_empty, memory_budget_bytes, release_memmap
+from .profiling import allocated, profile, stage
+from .render_cache import cache_key, coverage_cache, coverage_key, render_cache
+
 logger = logging.getLogger("FL_PathAnimator")
 
+# Frames rendered per chunk by iter_frames / render_chunks
+STREAM_CHUNK_FRAMES = 16
+# Loops at which the 121 WAN ATI track samples still give every pass, forward or back, two samples
+MAX_LOOP_COUNT = 30
+# Output frames of a looped animation, 20 loops of the longest frame_count
+MAX_OUTPUT_FRAMES = 10000
+
+def output_is_linked(prompt, node_id, output_index):
+    """
+    Check whether any node in a ComfyUI prompt reads the given output of a node.
+    Without a prompt (outside ComfyUI) every output counts as linked.
+    """
+    if not prompt or node_id is None:
+        return True
+    for node in prompt.values():
+        for value in node.get('inputs', {}).values():
+            if isinstance(value, list) and len(value) == 2 and str(value[0]) == str(node_id) \
+                    and value[1] == output_index:
+                return True
+    return False
+
+def renders_mask_only(render_mode, prompt=None, node_id=None):
+    """
+    Whether a render_mode renders the masks alone: always for 'mask_only', and for
+    'auto' while nothing reads the IMAGE output (never outside ComfyUI).
+    """
+    return render_mode == 'mask_only' or (render_mode == 'auto' and not output_is_linked(prompt, node_id, 0))
+
+def loop_frames(frame_count, loop_count=1, ping_pong=False):
+    """
+    Solved frame shown at each output frame of a looped animation: the frame_count
+    frames forward, then with ping_pong back again without repeating the turning
+    frames (so cycles join up), the whole cycle repeated loop_count times.
+    """
+    cycle = np.arange(frame_count)
+    if ping_pong:
+        cycle = np.concatenate([cycle, cycle[-2:0:-1]])
+    return np.tile(cycle, loop_count)
+
+def loop_track_times(frame_count, loop_count=1, ping_pong=False, num_samples=121):
+    """
+    Timeline position (0 to 1 over one forward pass) shown at each of num_samples
+    evenly spaced points of a looped clip, following loop_frames. Samples between
+    consecutive frames interpolate; across the jump from the last frame of a cycle
+    back to the first they take the nearer frame instead.
+    """
+    sequence = loop_frames(frame_count, loop_count, ping_pong)
+    position = np.linspace(0, len(sequence) - 1, num_samples)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, len(sequence) - 1)
+    fraction = position - lower
+    start, end = sequence[lower], sequence[upper]
+    frame = np.where(np.abs(end - start) <= 1, start + (end - start) * fraction,
+                     np.where(fraction < 0.5, start, end))
+    return frame / max(frame_count - 1, 1)
+
 def pil2tensor(image):
     """Convert PIL Image to tensor"""
-    return torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
+    return torch.from_numpy(np.divide(np.asarray(image), 255.0, dtype=np.float32)).unsqueeze(0)
 
 def tensor2pil(tensor):
     """Convert tensor to PIL Image"""
@@ -28,6 +95,12 @@ def parse_color(color):
                 return (255, 255, 255)
     return color
 
+def points_to_array(points):
+    """Convert a list of {x, y} dicts (or an existing array) to an (N, 2) float64 array"""
+    if isinstance(points, np.ndarray):
+        return points.astype(np.float64, copy=False).reshape(-1, 2)
+    return np.array([(p['x'], p['y']) for p in points], dtype=np.float64).reshape(-1, 2)
+
 def apply_interpolation(t, interpolation_type='linear'):
     """Apply interpolation easing function to parameter t (0.0 to 1.0)"""
     if interpolation_type == 'ease-in':
@@ -42,6 +115,17 @@ def apply_interpolation(t, interpolation_type='linear'):
     else:
         return t
 
+def apply_interpolation_array(t, interpolation_type='linear'):
+    """Vectorized apply_interpolation for a NumPy array of t values"""
+    if interpolation_type == 'ease-in':
+        return t * t
+    elif interpolation_type == 'ease-out':
+        return t * (2 - t)
+    elif interpolation_type == 'ease-in-out':
+        return np.where(t < 0.5, 2 * t * t, -1 + (4 - 2 * t) * t)
+    else:
+        return t
+
 class FL_PathAnimator:
 
     RETURN_TYPES = ("IMAGE", "MASK", "STRING",)
@@ -84,7 +168,41 @@ Outputs WAN ATI-compatible coordinate strings with proper 121-point resampling f
                 "end_time_percent": ("FLOAT", {"default": 100.0, "min": 0.0, "max": 100.0, "step": 0.1, "display": "number"}),
                 "override_path_length": ("INT", {"default": -1, "min": -1, "max": 8192, "step": 1, "display": "number"}),
                 "path_length_multiplier": ("FLOAT", {"default": 1.0, "min": 0.01, "max": 100.0, "step": 0.1, "display": "number"}),
-            }
+                # pil: exact ImageDraw shapes, sdf: batched anti-aliased signed distance fields,
+                # sprite: polygon shapes pre-rasterized per quantized rotation and stamped into a frame buffer
+                "render_engine": (['pil', 'sdf', 'sprite'], {"default": 'pil'}),
+                # Worker threads for frame rendering, 0 uses every CPU core
+                "num_threads": ("INT", {"default": 0, "min": 0, "max": 256, "step": 1}),
+                # thread: worker threads in this process, process: worker processes rendering
+                # into a shared memory output (for very large sequences where threads contend on the GIL)
+                "parallel_backend": (['thread', 'process'], {"default": 'thread'}),
+                # pil: per-frame ImageFilter.GaussianBlur around the shapes,
+                # torch: separable convolution over the whole frame stack at once
+                "blur_engine": (['pil', 'torch'], {"default": 'pil'}),
+                # memory: regular tensors, memmap: tensors backed by files in the temp directory for
+                # sequences larger than RAM, auto: memmap once the output exceeds the memory budget
+                "output_mode": (['memory', 'memmap', 'auto'], {"default": 'memory'}),
+                # antialiased: shape coverage (fill and border), hard: shape coverage thresholded
+                # at one half, effects: shape coverage with the same blur and trail as the image
+                "mask_mode": (['antialiased', 'hard', 'effects'], {"default": 'antialiased'}),
+                # full: always render images, mask_only: single-channel masks with IMAGE as a
+                # grayscale view of them, auto: mask only when nothing reads the IMAGE output.
+                # ComfyUI does not re-run the node when IMAGE gets connected later, so with auto
+                # that run's grayscale view is served as IMAGE until an input changes
+                "render_mode": (['full', 'auto', 'mask_only'], {"default": 'full'}),
+                # float32: standard IMAGE/MASK tensors, float16: half the output memory for
+                # downstream nodes that accept half precision
+                "output_precision": (['float32', 'float16'], {"default": 'float32'}),
+                # Repeat the animation loop_count times, each time forward and back with ping_pong;
+                # only the first period is rendered, the repeats are copied from it
+                "loop_count": ("INT", {"default": 1, "min": 1, "max": MAX_LOOP_COUNT, "step": 1}),
+                "ping_pong": ("BOOLEAN", {"default": False}),
+            },
+            "hidden": {
+                # Used to skip all RGB work when only the MASK output is connected
+                "prompt": "PROMPT",
+                "unique_id": "UNIQUE_ID",
+            },
         }
 
     def draw_shape(self, draw, shape, center_x, center_y, size, rotation, fill_color, border_width=0, border_color='white'):
@@ -171,54 +289,66 @@ Outputs WAN ATI-compatible coordinate strings with proper 121-point resampling f
         Returns:
             List of {x, y} dicts with exactly num_samples points evenly distributed along the arc
         """
-        if len(points) == 0:
-            return []
+        resampled = self.resample_paths_uniform([points], num_samples=num_samples)[0]
+        return [{'x': x, 'y': y} for x, y in resampled.tolist()]
 
-        # SOLUTION 1: Support static single points
-        if len(points) == 1:
-            # Single point - repeat for all samples (creates static anchor)
-            return [{'x': points[0]['x'], 'y': points[0]['y']} for _ in range(num_samples)]
-
-        # Calculate cumulative arc lengths along the path
-        cumulative_lengths = [0.0]
-        for i in range(len(points) - 1):
-            dx = points[i + 1]['x'] - points[i]['x']
-            dy = points[i + 1]['y'] - points[i]['y']
-            length = math.sqrt(dx * dx + dy * dy)
-            cumulative_lengths.append(cumulative_lengths[-1] + length)
+    def resample_paths_uniform(self, paths_points, num_samples=121):
+        """
+        Vectorized resample_path_uniform for many paths in one call.
+        Each path costs one np.cumsum plus one np.searchsorted over its segments,
+        O(n log m) instead of scanning every segment for every sample.
 
-        total_length = cumulative_lengths[-1]
+        Args:
+            paths_points: List of paths, each a list of {x, y} dicts or an (N, 2) array
+            num_samples: Number of points to resample to (default 121 for WAN ATI)
 
-        # Handle zero-length path (all points are the same)
-        if total_length == 0:
-            return [{'x': points[0]['x'], 'y': points[0]['y']} for _ in range(num_samples)]
+        Returns:
+            List of (num_samples, 2) float64 arrays, or (0, 2) arrays for empty paths
+        """
+        if num_samples > 1:
+            fractions = np.arange(num_samples) / (num_samples - 1)
+        else:
+            fractions = np.zeros(num_samples, dtype=np.float64)
 
-        # Resample at even intervals along the arc
         resampled = []
-        for i in range(num_samples):
-            # Calculate target distance along path
-            if num_samples == 1:
-                target_length = 0
-            else:
-                target_length = (i / (num_samples - 1)) * total_length
-
-            # Find segment containing target length
-            for j in range(len(cumulative_lengths) - 1):
-                if cumulative_lengths[j] <= target_length <= cumulative_lengths[j + 1]:
-                    # Interpolate within this segment
-                    seg_length = cumulative_lengths[j + 1] - cumulative_lengths[j]
-                    if seg_length > 0:
-                        t = (target_length - cumulative_lengths[j]) / seg_length
-                    else:
-                        t = 0
-
-                    x = points[j]['x'] + t * (points[j + 1]['x'] - points[j]['x'])
-                    y = points[j]['y'] + t * (points[j + 1]['y'] - points[j]['y'])
-                    resampled.append({'x': x, 'y': y})
-                    break
-            else:
-                # Fallback to last point (shouldn't happen with correct logic)
-                resampled.append({'x': points[-1]['x'], 'y': points[-1]['y']})
+        for points in paths_points:
+            xy = points_to_array(points)
+            if len(xy) == 0:
+                resampled.append(np.zeros((0, 2), dtype=np.float64))
+                continue
+
+            # Single point (static anchor) - repeat for all samples
+            if len(xy) == 1:
+                resampled.append(np.repeat(xy[:1], num_samples, axis=0))
+                continue
+
+            deltas = np.diff(xy, axis=0)
+            cumulative_lengths = np.zeros(len(xy), dtype=np.float64)
+            np.cumsum(np.sqrt(deltas[:, 0] * deltas[:, 0] + deltas[:, 1] * deltas[:, 1]),
+                      out=cumulative_lengths[1:])
+            total_length = cumulative_lengths[-1]
+
+            # Handle zero-length path (all points are the same)
+            if total_length == 0:
+                resampled.append(np.repeat(xy[:1], num_samples, axis=0))
+                continue
+
+            # Find the segment containing each target length along the arc
+            target_lengths = fractions * total_length
+            seg = np.searchsorted(cumulative_lengths[1:], target_lengths, side='left')
+            past_end = seg >= len(xy) - 1
+            seg = np.minimum(seg, len(xy) - 2)
+
+            seg_start = cumulative_lengths[seg]
+            seg_length = cumulative_lengths[seg + 1] - seg_start
+            safe_length = np.where(seg_length > 0, seg_length, 1.0)
+            t = np.where(seg_length > 0, (target_lengths - seg_start) / safe_length, 0.0)
+
+            p0 = xy[seg]
+            p1 = xy[seg + 1]
+            samples = p0 + t[:, None] * (p1 - p0)
+            samples[past_end] = xy[-1]
+            resampled.append(samples)
 
         return resampled
 
@@ -278,235 +408,694 @@ Outputs WAN ATI-compatible coordinate strings with proper 121-point resampling f
         # Return last point if we've gone past the end
         return (points[-1]['x'], points[-1]['y'])
 
-    def animate_paths(self, frame_width, frame_height, frame_count, shape, shape_size,
-                     shape_color, bg_color, blur_radius=0.0, trail_length=0.0,
-                     rotation_speed=0.0, border_width=0, border_color='white',
-                     paths_data='{"paths": [], "canvas_size": {"width": 512, "height": 512}}',
-                     start_time_percent=0.0, end_time_percent=100.0,
-                     override_path_length=-1, path_length_multiplier=1.0):
+    def build_arc_length_table(self, points):
+        """
+        Build the arc-length lookup table for a path.
 
-        # Parse colors
-        shape_color = parse_color(shape_color)
-        bg_color = parse_color(bg_color)
-        border_color = parse_color(border_color)
+        Returns:
+            (xy, cumulative, segment_lengths) where xy is an (N, 2) float64 array of the
+            path points, cumulative is an (N,) array of arc lengths (cumulative[0] == 0)
+            and segment_lengths is the (N - 1,) array of per-segment lengths.
+        """
+        xy = points_to_array(points)
+        deltas = np.diff(xy, axis=0)
+        segment_lengths = np.sqrt(deltas[:, 0] * deltas[:, 0] + deltas[:, 1] * deltas[:, 1])
+        cumulative = np.zeros(len(xy), dtype=np.float64)
+        np.cumsum(segment_lengths, out=cumulative[1:])
+        return xy, cumulative, segment_lengths
+
+    def sample_arc_length_table(self, xy, cumulative, segment_lengths, t):
+        """
+        Vectorized interpolate_path: sample positions at every t in a 1D array.
+        Produces the same values as calling interpolate_path once per t.
 
-        # Parse paths data
-        try:
-            paths_obj = json.loads(paths_data)
-            paths = paths_obj.get('paths', [])
-            canvas_size = paths_obj.get('canvas_size', {'width': frame_width, 'height': frame_height})
-        except json.JSONDecodeError:
-            logger.warning("Invalid JSON in paths_data, using empty paths")
-            paths = []
-            canvas_size = {'width': frame_width, 'height': frame_height}
-
-        # Calculate scaling factors to transform from canvas coordinates to frame coordinates
-        canvas_width = canvas_size.get('width', frame_width)
-        canvas_height = canvas_size.get('height', frame_height)
-        scale_x = frame_width / canvas_width if canvas_width > 0 else 1.0
-        scale_y = frame_height / canvas_height if canvas_height > 0 else 1.0
-
-        # Scale all path coordinates
-        scaled_paths = []
-        for path in paths:
-            scaled_path = path.copy()
-            scaled_points = []
-            for point in path.get('points', []):
-                scaled_points.append({
-                    'x': point['x'] * scale_x,
-                    'y': point['y'] * scale_y
-                })
-            scaled_path['points'] = scaled_points
-
-            # Preserve isSinglePoint flag if it exists
-            if 'isSinglePoint' in path:
-                scaled_path['isSinglePoint'] = path['isSinglePoint']
-
-            scaled_paths.append(scaled_path)
-
-        # --- Path length scaling (B1 fix: delta-based, not radial) ---
-        # B7 fix: treat override_path_length=0 as disabled (same as -1)
-        effective_override = override_path_length if override_path_length > 0 else -1
-
-        for path in scaled_paths:
-            points = path.get('points', [])
-            is_motion_path = len(points) > 1 and not path.get('isSinglePoint', False)
+        Returns:
+            (len(t), 2) float64 array of positions
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if len(xy) == 0:
+            return np.zeros((len(t), 2), dtype=np.float64)
+        if len(xy) == 1 or cumulative[-1] == 0:
+            return np.broadcast_to(xy[0], (len(t), 2)).copy()
+
+        target = t * cumulative[-1]
+        # First segment whose end distance reaches the target (same rule as interpolate_path)
+        seg = np.searchsorted(cumulative[1:], target, side='left')
+        past_end = seg >= len(xy) - 1
+        seg = np.minimum(seg, len(xy) - 2)
+
+        seg_start = cumulative[seg]
+        seg_length = segment_lengths[seg]
+        safe_length = np.where(seg_length > 0, seg_length, 1.0)
+        segment_t = np.where(seg_length > 0, (target - seg_start) / safe_length, 0.0)
+
+        p0 = xy[seg]
+        p1 = xy[seg + 1]
+        positions = p0 + (p1 - p0) * segment_t[:, None]
+        positions[past_end] = xy[-1]
+        return positions
+
+    def solve_positions(self, scaled_paths, frame_count, rotation_speed, timeline=None):
+        """
+        Solve shape positions for every frame and path at once.
 
-            if not is_motion_path:
-                continue
+        Each path's arc-length table is built once, then all frames are resolved together
+        (eased t -> np.searchsorted -> lerp) with the same timing rules as the per-frame loop.
+
+        Args:
+            scaled_paths: List of path dicts in frame coordinates
+            frame_count: Number of frames
+            rotation_speed: Rotation speed input of the node
+            timeline: Optional (start, end) global timeline override (0.0 to 1.0)
+
+        Returns:
+            positions: (F, P, 2) float64 array of shape centers
+            rotations: (F, P) float64 array of shape rotations in degrees
+            visible: (F, P) bool array, False where a path is not drawn
+        """
+        num_paths = len(scaled_paths)
+        positions = np.zeros((frame_count, num_paths, 2), dtype=np.float64)
+        rotations = np.zeros((frame_count, num_paths), dtype=np.float64)
+        visible = np.zeros((frame_count, num_paths), dtype=bool)
+
+        global_t = np.arange(frame_count) / max(frame_count - 1, 1)
 
-            original_length = self.get_path_arc_length(points)
-            if original_length <= 0:
+        for path_idx, path in enumerate(scaled_paths):
+            points = path.get('points', [])
+            if len(points) == 0:
                 continue
 
-            # Determine the base length
-            if effective_override > 0:
-                base_length = float(effective_override)
+            if timeline is not None:
+                start_time, end_time = timeline
             else:
-                base_length = original_length
+                start_time = path.get('startTime', 0.0)
+                end_time = path.get('endTime', 1.0)
 
-            # Apply path_length_multiplier
-            target_length = base_length * path_length_multiplier
+            interpolation = path.get('interpolation', 'linear')
+            visibility_mode = path.get('visibilityMode', 'pop')
 
-            if abs(target_length - original_length) < 1e-6:
-                continue
+            xy, cumulative, segment_lengths = self.build_arc_length_table(points)
 
-            # B1 fix: delta-based scaling instead of radial scaling from points[0].
-            # Scale inter-segment deltas uniformly to preserve curve shape.
-            scale_factor = target_length / original_length
-            logger.info(f"Scaling path '{path.get('name', 'Untitled')}' "
-                        f"from {original_length:.1f}px to {target_length:.1f}px "
-                        f"(factor: {scale_factor:.2f}x)")
-
-            new_points = [{'x': points[0]['x'], 'y': points[0]['y']}]
-            for i in range(1, len(points)):
-                dx = points[i]['x'] - points[i - 1]['x']
-                dy = points[i]['y'] - points[i - 1]['y']
-                new_points.append({
-                    'x': new_points[-1]['x'] + dx * scale_factor,
-                    'y': new_points[-1]['y'] + dy * scale_factor,
-                })
-            path['points'] = new_points
-
-        # --- Global timeline override ---
-        # B4 fix: swap start/end if inverted, clamp both to [0.0, 1.0]
-        use_global_timeline = (start_time_percent != 0.0 or end_time_percent != 100.0)
-        if use_global_timeline:
-            global_start_time = max(0.0, min(1.0, start_time_percent / 100.0))
-            global_end_time = max(0.0, min(1.0, end_time_percent / 100.0))
-            # B4 fix: swap if inverted
-            if global_start_time > global_end_time:
-                global_start_time, global_end_time = global_end_time, global_start_time
-            # B4 fix: ensure nonzero duration
-            if global_start_time == global_end_time:
-                global_end_time = min(1.0, global_start_time + 0.01)
-            # B6 fix: log warning
-            logger.info(f"Global timeline override: {global_start_time*100:.1f}% to {global_end_time*100:.1f}%")
-
-        images_list = []
-        masks_list = []
-        previous_output = None
-
-        for frame in range(frame_count):
-            # Create blank image with bg_color
-            image = Image.new("RGB", (frame_width, frame_height), bg_color)
-            draw = ImageDraw.Draw(image)
-
-            # Calculate global time (0.0 to 1.0)
-            global_t = frame / max(frame_count - 1, 1)
-
-            # Draw each path's shape
-            for path_idx, path in enumerate(scaled_paths):
-                points = path.get('points', [])
-                if len(points) == 0:
-                    continue
+            in_timeline = (start_time <= global_t) & (global_t <= end_time)
+            if visibility_mode == 'pop':
+                visible[:, path_idx] = in_timeline
+            else:
+                visible[:, path_idx] = True
+
+            # Path parameter per frame; frames outside the timeline hold the start or end pose
+            t = np.zeros(frame_count, dtype=np.float64)
+            rotation = np.zeros(frame_count, dtype=np.float64)
+
+            if end_time > start_time:
+                animated = in_timeline
+                local_t = (global_t[animated] - start_time) / (end_time - start_time)
+                eased_t = apply_interpolation_array(local_t, interpolation)
+                t[animated] = eased_t
+                rotation[animated] = rotation_speed * eased_t * 360.0
+            else:
+                animated = np.zeros(frame_count, dtype=bool)
 
-                # Get timeline parameters
-                if use_global_timeline:
-                    # B6 fix: log when overriding per-path timing
-                    start_time = global_start_time
-                    end_time = global_end_time
-                else:
-                    start_time = path.get('startTime', 0.0)
-                    end_time = path.get('endTime', 1.0)
+            if visibility_mode == 'static':
+                after_end = ~animated & (global_t >= start_time)
+                t[after_end] = 1.0
+                rotation[after_end] = rotation_speed * 360.0
 
-                interpolation = path.get('interpolation', 'linear')
-                visibility_mode = path.get('visibilityMode', 'pop')
+            positions[:, path_idx] = self.sample_arc_length_table(xy, cumulative, segment_lengths, t)
+            rotations[:, path_idx] = rotation
 
-                # Determine if shape should be visible and animated
-                is_in_timeline = start_time <= global_t <= end_time
+        return positions, rotations, visible
 
-                # Skip rendering based on visibility mode
-                if visibility_mode == 'pop' and not is_in_timeline:
-                    # Pop mode: don't render outside timeline
-                    continue
+    def apply_trail(self, frames, trail_length, previous_output=None, scratch=None, repeats=None):
+        """
+        Apply the trail recurrence in place over an (N, H, W, 3) stack of rendered frames
+        (or an (N, H, W) stack of masks).
 
-                # Calculate local time and position
-                if is_in_timeline and end_time > start_time:
-                    # Animate within timeline
-                    local_t = (global_t - start_time) / (end_time - start_time)
-                    eased_t = apply_interpolation(local_t, interpolation)
-                    x, y = self.interpolate_path(points, eased_t)
-                    # Calculate rotation based on local time
-                    current_rotation = rotation_speed * eased_t * 360.0
-                elif visibility_mode == 'static':
-                    # B3 fix: keep upstream's fallback render at start position
-                    if global_t < start_time:
-                        x, y = self.interpolate_path(points, 0.0)
-                        current_rotation = 0.0
-                    else:
-                        x, y = self.interpolate_path(points, 1.0)
-                        current_rotation = rotation_speed * 360.0
-                else:
-                    # B3 fix: fallback to start position (don't skip)
-                    x, y = self.interpolate_path(points, 0.0)
-                    current_rotation = 0.0
+        Each frame becomes (frame + trail_length * previous) / max, where previous is the
+        already-processed frame before it, so the output buffer itself carries the trail
+        state and no per-frame clone is needed. A single scratch buffer is reused for the
+        multiply.
 
-                # Draw the shape
-                self.draw_shape(draw, shape, x, y, shape_size, current_rotation,
-                              shape_color, border_width, border_color)
+        Over a run of identical rendered frames the recurrence settles on a fixed point.
+        Once an output frame equals the one before it, the rest of the run is copied.
+
+        Args:
+            frames: (N, H, W, 3) float tensor, modified in place
+            trail_length: Trail feedback factor
+            previous_output: Optional (H, W, 3) last output frame before this stack
+            scratch: Optional buffer of one frame's shape and dtype to reuse
+            repeats: Optional (N,) bool array, True for frames rendered the same as the frame
+                before them (FrameRenderer.repeated_frames)
 
-            # Apply blur
-            if blur_radius > 0:
-                image = image.filter(ImageFilter.GaussianBlur(blur_radius))
+        Returns:
+            frames
+        """
+        if trail_length <= 0:
+            return frames
+        if scratch is None:
+            scratch = torch.empty(frames.shape[1:], dtype=frames.dtype)
+
+        converged = False
+        for frame in range(len(frames)):
+            previous = frames[frame - 1] if frame > 0 else previous_output
+            if previous is None:
+                continue
 
-            # Convert to tensor
-            image_tensor = pil2tensor(image)
+            current = frames[frame]
+            repeated = repeats is not None and repeats[frame]
+            if repeated and converged:
+                current.copy_(previous)
+                continue
 
             # B2 fix: keep upstream's trail normalization (smooth glow, not hard-clamp)
-            if trail_length > 0 and previous_output is not None:
-                image_tensor = image_tensor + trail_length * previous_output
-                max_val = image_tensor.max()
-                if max_val > 0:
-                    image_tensor = image_tensor / max_val
+            torch.mul(previous, trail_length, out=scratch)
+            current.add_(scratch)
+            max_val = current.max()
+            if max_val > 0 and max_val != 1:
+                current.div_(max_val)
+            converged = repeated and torch.equal(current, previous)
+
+        return frames
 
-            previous_output = image_tensor.clone()
+    def render_frames(self, renderer, start, stop, outputs, executor=None, num_workers=1):
+        """
+        Render frames [start, stop) of a FrameRenderer into (N, ...) output arrays.
 
-            # Clamp values
-            image_tensor = torch.clamp(image_tensor, 0.0, 1.0)
+        Frames are independent once positions are solved, so they are split into
+        contiguous ranges and rendered on a thread pool. PIL's blur and NumPy's
+        conversion release the GIL, drawing itself mostly does not. The result is
+        identical to rendering serially.
 
-            # Extract mask from red channel
-            mask = image_tensor[:, :, :, 0]
+        Args:
+            renderer: FrameRenderer for the solved animation
+            start, stop: Frame range
+            outputs: Arrays for FrameRenderer.render_range, each with stop - start frames:
+                (N, H, W, 3) images, (N, H, W) masks of the output dtype and optionally
+                (N, H, W, 2) uint8 coverage, written in place
+            executor: Optional ThreadPoolExecutor, frames are rendered serially without one
+            num_workers: Threads of the executor
+        """
+        if executor is None or num_workers <= 1:
+            renderer.render_range(start, stop, *outputs)
+            return outputs
+
+        # A few ranges per thread keeps the pool balanced when frame costs differ
+        step = max(1, -(-(stop - start) // (num_workers * 4)))
+        futures = [executor.submit(renderer.render_range, first, min(first + step, stop),
+                                   *(out[first - start:min(first + step, stop) - start] for out in outputs))
+                   for first in range(start, stop, step)]
+        for future in futures:
+            future.result()
+        return outputs
+
+    def render_chunks(self, plan, chunk_size=STREAM_CHUNK_FRAMES, out_images=None, out_masks=None, out_shared=None,
+                      out_coverage=None):
+        """
+        Render a prepared animation (see prepare_animation) chunk by chunk.
 
-            images_list.append(image_tensor)
-            masks_list.append(mask)
+        The trail is carried from each chunk into the next, so the chunks join up
+        into exactly the frames animate_paths returns.
 
-        # Concatenate all frames
-        out_images = torch.cat(images_list, dim=0)
-        out_masks = torch.cat(masks_list, dim=0)
+        When rendering into full output stacks, a periodic animation (see loop_frames)
+        is rendered for one period, and for as long as the trail takes to settle; the
+        rest is copied from one period earlier.
 
-        # Generate WAN ATI-compatible coordinate string
-        # B5 fix: subsample coords to respect global timeline window
-        coord_tracks = []
-        for path in scaled_paths:
-            points = path.get('points', [])
+        Args:
+            plan: Render plan from prepare_animation
+            chunk_size: Frames per chunk
+            out_images: Optional (F, H, W, 3) output stack of the plan's output precision,
+                together with out_masks unless the plan renders masks only
+            out_masks: Optional (F, H, W) output stack; chunks are then views into it.
+                Without it one chunk-sized buffer is reused for every chunk, so copy a chunk
+                that has to outlive the next iteration.
+            out_shared: SharedMemory blocks or memmap file paths backing out_images and
+                out_masks, required for the process backend
+            out_coverage: Optional (F, H, W, 2) uint8 array that receives the coverage
+                stack (thread backend only), for the coverage cache
+
+        Yields:
+            (start, images, masks): frames [start, start + len(images)) as (N, H, W, 3) and
+            (N, H, W) float tensors. When the plan renders masks only, images is a
+            grayscale view of the masks.
+        """
+        renderer = plan['renderer']
+        frame_count = renderer.frame_count
+        frame_shape = (renderer.frame_height, renderer.frame_width)
+        trail_length = plan['trail_length']
+        num_workers = plan['num_workers']
+        use_processes = plan['parallel_backend'] == 'process' and num_workers > 1
+        mask_only = plan['mask_only']
+        mask_effects = plan['mask_mode'] == 'effects'
+        dtype = getattr(torch, plan['output_precision'])
+        chunk_size = max(1, min(chunk_size, frame_count))
+
+        streaming = out_masks is None
+        owned_shm = []
+        if streaming:
+            image_shm = None
+            if use_processes:
+                out_masks, mask_shm = shared_empty((chunk_size, *frame_shape), renderer.output_dtype)
+                if not mask_only:
+                    out_images, image_shm = shared_empty((chunk_size, *frame_shape, 3), renderer.output_dtype)
+                out_shared = (image_shm, mask_shm)
+                owned_shm = [shm for shm in out_shared if shm is not None]
+            else:
+                out_masks = torch.empty((chunk_size, *frame_shape), dtype=dtype)
+                if not mask_only:
+                    out_images = torch.empty((chunk_size, *frame_shape, 3), dtype=dtype)
+        elif use_processes and out_shared is None:
+            raise ValueError("The process backend renders into shared memory, pass out_shared with out_images")
+
+        # Trail state per trailed output: the last frame of the previous chunk when streaming and a scratch buffer
+        image_trail = trail_length > 0 and not mask_only
+        mask_trail = trail_length > 0 and mask_effects
+        previous_output = torch.empty((*frame_shape, 3), dtype=dtype) if image_trail and streaming else None
+        previous_mask = torch.empty(frame_shape, dtype=dtype) if mask_trail and streaming else None
+        trail_scratch = torch.empty((*frame_shape, 3), dtype=dtype) if image_trail else None
+        mask_scratch = torch.empty(frame_shape, dtype=dtype) if mask_trail else None
+
+        # Rendered (blurred, not yet trailed) last frame of a chunk whose state carries on into
+        # the next chunk, copied into that chunk's leading repeats instead of rendering them
+        sources = renderer.frame_sources
+        run_source = -1
+        run_image = None if mask_only else torch.empty((*frame_shape, 3), dtype=dtype)
+        run_mask = torch.empty(frame_shape, dtype=dtype)
+
+        # Past the first period of a periodic animation every frame repeats the one a period earlier:
+        # from the second period on without a trail, once the trail has settled with one.
+        # Only the full output stacks keep the earlier frames to copy
+        period = None if streaming else renderer.period
+        tile_start = period if not (image_trail or mask_trail) else None
+
+        pool = None
+        if use_processes:
+            try:
+                pool = ProcessRenderPool(renderer, num_workers, out_shared,
+                                         (None if mask_only else tuple(out_images.shape), tuple(out_masks.shape)),
+                                         renderer.output_dtype)
+            except BrokenProcessPool as error:
+                # The shared buffers are ordinary tensors to the thread backend
+                logger.warning(f"Process backend unavailable, rendering on threads: {error}")
+                use_processes = False
+        if not use_processes and num_workers > 1:
+            pool = ThreadPoolExecutor(max_workers=num_workers)
+
+        try:
+            start = 0
+            while start < frame_count:
+                stop = min(start + chunk_size, frame_count)
+                if tile_start is not None and start < tile_start < stop:
+                    stop = tile_start
+                offset = 0 if streaming else start
+                images = None if mask_only else out_images[offset:offset + stop - start]
+                masks = out_masks[offset:offset + stop - start]
+                if tile_start is not None and start >= tile_start:
+                    # Periodic from here on, copy every frame from one period earlier
+                    with stage('tile'):
+                        for first in range(start, stop, period):
+                            count = min(period, stop - first)
+                            for stack in (out_images, out_masks, out_coverage):
+                                if stack is not None:
+                                    stack[first:first + count] = stack[first - period:first - period + count]
+                else:
+                    run = stop - start
+                    if not (sources[start:stop] == run_source).all():
+                        run = int(np.argmin(sources[start:stop] == run_source))
+
+                    if run < stop - start:
+                        if use_processes:
+                            pool.render(start + run, stop, offset + run)
+                        else:
+                            outputs = (None if mask_only else images[run:].numpy(), masks[run:].numpy())
+                            if out_coverage is not None:
+                                outputs += (out_coverage[start + run:stop],)
+                            self.render_frames(renderer, start + run, stop, outputs, pool, num_workers)
+
+                        if plan['stack_blur_radius'] > 0:
+                            with stage('stack_blur'):
+                                if not mask_only:
+                                    blur_frames(images[run:], plan['stack_blur_radius'])
+                                if mask_effects:
+                                    blur_frames(masks[run:].unsqueeze(-1), plan['stack_blur_radius'])
+
+                    if run > 0:
+                        with stage('copy'):
+                            if not mask_only:
+                                images[:run] = run_image
+                            masks[:run] = run_mask
+                            if out_coverage is not None:
+                                out_coverage[start:start + run] = out_coverage[start - 1]
+                    run_source = -1
+                    if stop < frame_count and sources[stop] == sources[stop - 1]:
+                        run_source = sources[stop - 1]
+                        if not mask_only:
+                            run_image.copy_(images[-1])
+                        run_mask.copy_(masks[-1])
+
+                    # Trail feedback from the previous output frame (already in [0, 1], no clamp needed)
+                    for frames, stack, carried, scratch in ((images, out_images, previous_output, trail_scratch),
+                                                            (masks, out_masks, previous_mask, mask_scratch)):
+                        if scratch is None:
+                            continue
+                        previous = None if start == 0 else carried if streaming else stack[start - 1]
+                        with stage('trail'):
+                            self.apply_trail(frames, trail_length, previous, scratch,
+                                             renderer.repeated_frames(start, stop))
+                        if streaming:
+                            carried.copy_(frames[-1])
+
+                    # With a trail the outputs are periodic once a frame matches the one a period earlier
+                    if tile_start is None and period is not None and stop > period and all(
+                            torch.equal(stack[stop - 1], stack[stop - 1 - period])
+                            for stack, scratch in ((out_images, trail_scratch), (out_masks, mask_scratch))
+                            if scratch is not None):
+                        tile_start = stop
+
+                if mask_only:
+                    # Nothing reads the image output, hand out the masks as grayscale
+                    images = masks.unsqueeze(-1).expand(-1, -1, -1, 3)
+                yield start, images, masks
+                start = stop
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            for shm in owned_shm:
+                shm.unlink()
+
+    def iter_frames(self, *args, chunk_size=STREAM_CHUNK_FRAMES, render_mode='full', prompt=None,
+                    unique_id=None, **kwargs):
+        """
+        Stream the animation in fixed-size chunks with bounded memory.
 
-            # Resample to exactly 121 points for WAN ATI compatibility
-            resampled_points = self.resample_path_uniform(points, num_samples=121)
+        Takes the same arguments as animate_paths except output_mode, with render_mode
+        mapped to the mask_only flag of prepare_animation (which may also be passed
+        directly). Frames are rendered chunk_size at a time into one reused buffer, so
+        peak memory is bounded by the chunk size rather than the frame count. Each
+        yielded chunk is only valid until the next one is requested.
 
-            if use_global_timeline and len(points) > 1 and not path.get('isSinglePoint', False):
-                # B5 fix: subsample the 121 points to only the global timeline window
+        Yields:
+            (start, images, masks) as in render_chunks
+        """
+        kwargs.setdefault('mask_only', renders_mask_only(render_mode, prompt, unique_id))
+        plan = self.prepare_animation(*args, **kwargs)
+        yield from self.render_chunks(plan, chunk_size)
+
+    def prepare_animation(self, frame_width, frame_height, frame_count, shape, shape_size,
+                          shape_color, bg_color, blur_radius=0.0, trail_length=0.0,
+                          rotation_speed=0.0, border_width=0, border_color='white',
+                          paths_data='{"paths": [], "canvas_size": {"width": 512, "height": 512}}',
+                          start_time_percent=0.0, end_time_percent=100.0,
+                          override_path_length=-1, path_length_multiplier=1.0,
+                          render_engine='pil', num_threads=0, parallel_backend='thread',
+                          blur_engine='pil', mask_mode='antialiased', mask_only=False,
+                          output_precision='float32', loop_count=1, ping_pong=False):
+        """
+        Parse, scale and solve an animation without rendering it.
+
+        Takes the same arguments as animate_paths, with mask_only set to render the
+        masks without any RGB work.
+
+        Returns:
+            Render plan dict for render_chunks: the FrameRenderer, trail and stack blur
+            settings, worker count and backend, mask settings, the coverage cache key and
+            the WAN ATI coordinate string
+        """
+        output_frames = len(loop_frames(frame_count, loop_count, ping_pong))
+        if not 1 <= loop_count <= MAX_LOOP_COUNT or output_frames > MAX_OUTPUT_FRAMES:
+            raise ValueError(f"loop_count {loop_count}{' with ping_pong' if ping_pong else ''} gives {output_frames} "
+                             f"output frames; at most {MAX_LOOP_COUNT} loops and {MAX_OUTPUT_FRAMES} frames "
+                             f"are supported")
+
+        # Renders that differ only in colors, blur or trail reuse the drawn coverage
+        geometry_key = coverage_key(locals())
+        cached_coverage = coverage_cache.get(geometry_key)
+
+        with stage('parse'):
+            # Parse colors
+            shape_color = parse_color(shape_color)
+            bg_color = parse_color(bg_color)
+            border_color = parse_color(border_color)
+
+            # Parse paths data
+            try:
+                paths_obj = json.loads(paths_data)
+                paths = paths_obj.get('paths', [])
+                canvas_size = paths_obj.get('canvas_size', {'width': frame_width, 'height': frame_height})
+            except json.JSONDecodeError:
+                logger.warning("Invalid JSON in paths_data, using empty paths")
+                paths = []
+                canvas_size = {'width': frame_width, 'height': frame_height}
+
+        with stage('scale'):
+            # Calculate scaling factors to transform from canvas coordinates to frame coordinates
+            canvas_width = canvas_size.get('width', frame_width)
+            canvas_height = canvas_size.get('height', frame_height)
+            scale_x = frame_width / canvas_width if canvas_width > 0 else 1.0
+            scale_y = frame_height / canvas_height if canvas_height > 0 else 1.0
+
+            # Scale all path coordinates
+            scaled_paths = []
+            for path in paths:
+                scaled_path = path.copy()
+                scaled_points = []
+                for point in path.get('points', []):
+                    scaled_points.append({
+                        'x': point['x'] * scale_x,
+                        'y': point['y'] * scale_y
+                    })
+                scaled_path['points'] = scaled_points
+
+                # Preserve isSinglePoint flag if it exists
+                if 'isSinglePoint' in path:
+                    scaled_path['isSinglePoint'] = path['isSinglePoint']
+
+                scaled_paths.append(scaled_path)
+
+            # --- Path length scaling (B1 fix: delta-based, not radial) ---
+            # B7 fix: treat override_path_length=0 as disabled (same as -1)
+            effective_override = override_path_length if override_path_length > 0 else -1
+
+            for path in scaled_paths:
+                points = path.get('points', [])
+                is_motion_path = len(points) > 1 and not path.get('isSinglePoint', False)
+
+                if not is_motion_path:
+                    continue
+
+                original_length = self.get_path_arc_length(points)
+                if original_length <= 0:
+                    continue
+
+                # Determine the base length
+                if effective_override > 0:
+                    base_length = float(effective_override)
+                else:
+                    base_length = original_length
+
+                # Apply path_length_multiplier
+                target_length = base_length * path_length_multiplier
+
+                if abs(target_length - original_length) < 1e-6:
+                    continue
+
+                # B1 fix: delta-based scaling instead of radial scaling from points[0].
+                # Scale inter-segment deltas uniformly to preserve curve shape.
+                scale_factor = target_length / original_length
+                logger.info(f"Scaling path '{path.get('name', 'Untitled')}' "
+                            f"from {original_length:.1f}px to {target_length:.1f}px "
+                            f"(factor: {scale_factor:.2f}x)")
+
+                new_points = [{'x': points[0]['x'], 'y': points[0]['y']}]
+                for i in range(1, len(points)):
+                    dx = points[i]['x'] - points[i - 1]['x']
+                    dy = points[i]['y'] - points[i - 1]['y']
+                    new_points.append({
+                        'x': new_points[-1]['x'] + dx * scale_factor,
+                        'y': new_points[-1]['y'] + dy * scale_factor,
+                    })
+                path['points'] = new_points
+
+            # --- Global timeline override ---
+            # B4 fix: swap start/end if inverted, clamp both to [0.0, 1.0]
+            use_global_timeline = (start_time_percent != 0.0 or end_time_percent != 100.0)
+            if use_global_timeline:
+                global_start_time = max(0.0, min(1.0, start_time_percent / 100.0))
+                global_end_time = max(0.0, min(1.0, end_time_percent / 100.0))
+                # B4 fix: swap if inverted
+                if global_start_time > global_end_time:
+                    global_start_time, global_end_time = global_end_time, global_start_time
+                # B4 fix: ensure nonzero duration
+                if global_start_time == global_end_time:
+                    global_end_time = min(1.0, global_start_time + 0.01)
+                # B6 fix: log warning
+                logger.info(f"Global timeline override: {global_start_time*100:.1f}% to {global_end_time*100:.1f}%")
+
+        with stage('solve'):
+            # Solve every frame's shape positions up front
+            positions, rotations, visible = self.solve_positions(
+                scaled_paths, frame_count, rotation_speed,
+                (global_start_time, global_end_time) if use_global_timeline else None)
+
+            # Looping repeats the solved frames; the renderer finds the period and copies it
+            if loop_count > 1 or ping_pong:
+                sequence = loop_frames(frame_count, loop_count, ping_pong)
+                positions, rotations, visible = positions[sequence], rotations[sequence], visible[sequence]
+
+        with stage('renderer'):
+            # The torch blur runs over each finished chunk instead of inside the renderer
+            stack_blur = blur_engine == 'torch' and blur_radius > 0
+            renderer = FrameRenderer(self.draw_shape, positions, rotations, visible, frame_width, frame_height,
+                                     shape, shape_size, shape_color, bg_color, border_width, border_color,
+                                     0.0 if stack_blur else blur_radius, render_engine, cached_coverage, mask_mode,
+                                     output_precision)
+
+        with stage('coordinates'):
+            # Generate WAN ATI-compatible coordinate string
+            # Resample every path to exactly 121 points for WAN ATI compatibility in one call
+            resampled_tracks = self.resample_paths_uniform(
+                [path.get('points', []) for path in scaled_paths], num_samples=121)
+
+            # B5 fix: subsample coords to respect global timeline window
+            if use_global_timeline:
                 # Map the global timeline percentage to indices
                 start_idx = int(round(global_start_time * 120))
                 end_idx = int(round(global_end_time * 120))
                 if end_idx <= start_idx:
                     end_idx = start_idx + 1
 
+                windowed_indices = [
+                    i for i, path in enumerate(scaled_paths)
+                    if len(path.get('points', [])) > 1 and not path.get('isSinglePoint', False)
+                ]
                 # Extract the windowed portion and re-resample to 121 points
-                windowed = resampled_points[start_idx:end_idx + 1]
-                if len(windowed) >= 2:
-                    resampled_points = self.resample_path_uniform(windowed, num_samples=121)
-
-            track_coords = [
-                {"x": int(round(p["x"])), "y": int(round(p["y"]))}
-                for p in resampled_points
+                windowed = [resampled_tracks[i][start_idx:end_idx + 1] for i in windowed_indices]
+                rewindowed = self.resample_paths_uniform(windowed, num_samples=121)
+                for i, window, track in zip(windowed_indices, windowed, rewindowed):
+                    if len(window) >= 2:
+                        resampled_tracks[i] = track
+
+            # Looped clips run the tracks along the same cycles as the frames
+            if loop_count > 1 or ping_pong:
+                track_index = loop_track_times(frame_count, loop_count, ping_pong) * 120
+                samples = np.arange(121)
+                resampled_tracks = [
+                    np.stack([np.interp(track_index, samples, track[:, 0]),
+                              np.interp(track_index, samples, track[:, 1])], axis=1) if len(track) else track
+                    for track in resampled_tracks
+                ]
+
+            coord_tracks = [
+                [{"x": x, "y": y} for x, y in np.rint(track).astype(np.int64).tolist()]
+                for track in resampled_tracks
             ]
 
-            coord_tracks.append(track_coords)
+            # Output as list of tracks (each track is a list of 121 {x, y} points)
+            coord_string = json.dumps(coord_tracks)
 
-        # Output as list of tracks (each track is a list of 121 {x, y} points)
-        coord_string = json.dumps(coord_tracks)
+            logger.info(f"Generated {len(coord_tracks)} tracks with 121 points each for WAN ATI")
 
-        logger.info(f"Generated {len(coord_tracks)} tracks with 121 points each for WAN ATI")
+        return {
+            'renderer': renderer,
+            'trail_length': trail_length,
+            'stack_blur_radius': blur_radius if stack_blur else 0.0,
+            'num_workers': min(num_threads if num_threads > 0 else os.cpu_count() or 1, renderer.frame_count),
+            'parallel_backend': parallel_backend,
+            'mask_mode': mask_mode,
+            'mask_only': mask_only,
+            'output_precision': output_precision,
+            'coverage_key': geometry_key,
+            'coordinates': coord_string,
+        }
 
-        return (out_images, out_masks, coord_string)
+    @profile('animate_paths')
+    def animate_paths(self, frame_width, frame_height, frame_count, shape, shape_size,
+                     shape_color, bg_color, blur_radius=0.0, trail_length=0.0,
+                     rotation_speed=0.0, border_width=0, border_color='white',
+                     paths_data='{"paths": [], "canvas_size": {"width": 512, "height": 512}}',
+                     start_time_percent=0.0, end_time_percent=100.0,
+                     override_path_length=-1, path_length_multiplier=1.0,
+                     render_engine='pil', num_threads=0, parallel_backend='thread',
+                     blur_engine='pil', output_mode='memory', mask_mode='antialiased', render_mode='full',
+                     output_precision='float32', loop_count=1, ping_pong=False, prompt=None, unique_id=None):
+
+        # With only the MASK output connected the images are never read, so skip the RGB work
+        mask_only = renders_mask_only(render_mode, prompt, unique_id)
+
+        # Identical inputs (paths compared by their render-relevant fields) return the cached render
+        with stage('cache'):
+            key = cache_key(locals())
+            cached = render_cache.get(key)
+        if cached is not None:
+            logger.info("Returning cached render")
+            return cached
+
+        plan = self.prepare_animation(
+            frame_width, frame_height, frame_count, shape, shape_size, shape_color, bg_color,
+            blur_radius, trail_length, rotation_speed, border_width, border_color, paths_data,
+            start_time_percent, end_time_percent, override_path_length, path_length_multiplier,
+            render_engine, num_threads, parallel_backend, blur_engine, mask_mode, mask_only, output_precision,
+            loop_count, ping_pong)
+
+        # Allocate the outputs once and stream every chunk into them in place
+        output_frames = plan['renderer'].frame_count
+        image_shape = (output_frames, frame_height, frame_width, 3)
+        mask_shape = (output_frames, frame_height, frame_width)
+        dtype = plan['renderer'].output_dtype
+        output_bytes = dtype.itemsize * ((0 if mask_only else math.prod(image_shape)) + math.prod(mask_shape))
+        use_memmap = output_mode == 'memmap' or (output_mode == 'auto' and output_bytes > memory_budget_bytes())
+        use_processes = plan['parallel_backend'] == 'process' and plan['num_workers'] > 1
+
+        with stage('allocate'):
+            out_images = out_shared = None
+            image_handle = None
+            # Torch, shared memory and memmap buffers are invisible to tracemalloc
+            allocated(output_bytes)
+            if use_memmap:
+                # Sequences larger than RAM are paged out to files in the temp directory
+                out_masks, mask_handle = memmap_empty(mask_shape, dtype)
+                if not mask_only:
+                    out_images, image_handle = memmap_empty(image_shape, dtype)
+                out_shared = (image_handle, mask_handle)
+                logger.info(f"Rendering {output_bytes / 2 ** 20:.0f} MB of output into memmap files")
+            elif use_processes:
+                # Worker processes write straight into the returned tensors
+                out_masks, mask_handle = shared_empty(mask_shape, dtype)
+                if not mask_only:
+                    out_images, image_handle = shared_empty(image_shape, dtype)
+                out_shared = (image_handle, mask_handle)
+            else:
+                out_masks = torch.empty(mask_shape, dtype=getattr(torch, output_precision))
+                if not mask_only:
+                    out_images = torch.empty(image_shape, dtype=getattr(torch, output_precision))
+
+            # Keep the drawn coverage so a later color-only change skips drawing
+            # (mask-only renders draw the shape coverage alone and have none to keep)
+            out_coverage = None
+            coverage_bytes = 2 * math.prod(mask_shape)
+            if (plan['renderer'].coverage_stack is None and not use_processes and not mask_only
+                    and coverage_cache.enabled and coverage_bytes <= coverage_cache.max_bytes):
+                out_coverage = np.empty((*mask_shape, 2), dtype=np.uint8)
+
+        chunk_size = max(STREAM_CHUNK_FRAMES, 4 * plan['num_workers'])
+        try:
+            with stage('render'):
+                for _ in self.render_chunks(plan, chunk_size, out_images, out_masks, out_shared, out_coverage):
+                    pass
+        finally:
+            # The mappings stay valid for the returned tensors after the names are removed
+            for handle in out_shared or ():
+                if handle is None:
+                    continue
+                if use_memmap:
+                    release_memmap(handle)
+                else:
+                    handle.unlink()
+
+        if mask_only:
+            # Nothing reads the image output, a grayscale view of the masks costs no memory
+            out_images = out_masks.unsqueeze(-1).expand(-1, -1, -1, 3)
+        result = (out_images, out_masks, plan['coordinates'])
+        with stage('cache'):
+            if out_coverage is not None:
+                coverage_cache.put(plan['coverage_key'], out_coverage)
+            render_cache.put(key, result)
+        return result
@@ -3,5 +3,6 @@ FL Path Animator Nodes
 """
 
 from .FL_PathAnimator import FL_PathAnimator
+from .synthetic_paths import FL_SyntheticPaths
 
-__all__ = ['FL_PathAnimator']
+__all__ = ['FL_PathAnimator', 'FL_SyntheticPaths']
@@ -0,0 +1,633 @@
+"""
+Per-frame rendering for the FL Path Animator.
+
+Once solve_positions has produced the (F, P) position, rotation and visibility
+tables, every frame is independent of the others: the trail is the only thing
+linking frames and it runs as a separate pass over the finished stack. A
+FrameRenderer holds the solved tables and the engine state and renders any
+frame or frame range on its own, so frames can be drawn in any order, in
+chunks and from several threads or processes.
+
+Frames that show the same shapes in the same poses render identically, so
+each frame state is drawn once per range and its repeats are copied from it.
+When the whole sequence of frame states is periodic (looped animations), only
+its first period needs rendering at all.
+Shapes that hold the same pose over several frames (pinned single points,
+'static' paths outside their window) are drawn once into a base layer per
+unique set of them, and each frame starts from a copy of its layer.
+
+Rendering is split into a color-independent coverage stage, which draws each
+frame's (fill, border) coverage as an (H, W, 2) uint8 array, and a colorize
+stage, which maps every coverage pair to its color through a lookup table. The
+mask is made from the shape coverage, fill and border together, in the same
+pass (see MASK_MODES), and a cached coverage stack lets color-only changes skip
+drawing entirely.
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from PIL import Image, ImageDraw, ImageFilter
+
+from .profiling import stage
+from .sdf_render import render_sdf_frames
+from .sprite_atlas import SpriteAtlas, SPRITE_SHAPES
+
+# Blur only the regions around shapes while they cover at most this fraction of the frame
+BLUR_REGION_MAX_FRACTION = 0.5
+# Static base layers kept per renderer, least recently used layers are redrawn on demand
+STATIC_LAYER_CACHE_SIZE = 16
+# Shapes whose drawing depends on rotation (draw_shape ignores it for circles and squares)
+ROTATING_SHAPES = ('triangle', 'hexagon', 'star')
+
+# draw_shape colors used to draw label images, and the (fill, border) coverage of each label
+LABEL_FILL = 1
+LABEL_BORDER = 2
+LABEL_COVERAGE = np.array([[0, 0], [255, 0], [0, 255]], dtype=np.uint8)
+LABEL_SHAPE_COVERAGE = np.array([0, 255, 255], dtype=np.uint8)
+# Shape coverage of every coverage code (see coverage_codes): fill plus border, capped where
+# the anti-aliased fill and border edges meet
+SHAPE_COVERAGE = np.minimum(np.arange(256)[:, None] + np.arange(256)[None, :], 255).astype(np.uint8).ravel()
+
+
+# hard: shape coverage thresholded at one half, antialiased: shape coverage as is,
+# effects: shape coverage blurred and trailed like the image
+MASK_MODES = ('antialiased', 'hard', 'effects')
+# Mask value of every 8-bit shape coverage per mode, blur and trail are applied on top
+MASK_TABLES = {
+    'antialiased': np.divide(np.arange(256, dtype=np.uint8), 255.0, dtype=np.float32),
+    'hard': (np.arange(256) >= 128).astype(np.float32),
+}
+MASK_TABLES['effects'] = MASK_TABLES['antialiased']
+
+# Output dtypes by output_precision; float16 halves the output memory
+OUTPUT_DTYPES = {'float32': np.float32, 'float16': np.float16}
+
+
+def coverage_codes(coverage):
+    """View (..., 2) uint8 coverage as (...) uint16 codes fill + 256 * border"""
+    return coverage.view('<u2')[..., 0]
+
+
+def colorize_table(fill_color, bg_color, border_color):
+    """
+    (65536, 3) uint8 colors of every coverage code: the background blended towards
+    the fill and border colors by their coverage. Full coverage gives the exact
+    fill or border color, so hard-edged coverage colorizes exactly like drawing
+    with the colors would.
+    """
+    fill_coverage = np.arange(256, dtype=np.float64)[None, :, None] / 255.0
+    border_coverage = np.arange(256, dtype=np.float64)[:, None, None] / 255.0
+    bg = np.array(bg_color[:3], dtype=np.float64)
+    fill = np.array(fill_color[:3], dtype=np.float64)
+    border = np.array(border_color[:3], dtype=np.float64)
+    colors = bg + fill_coverage * (fill - bg) + border_coverage * (border - bg)
+    return np.clip(np.rint(colors), 0, 255).astype(np.uint8).reshape(-1, 3)
+
+
+def gaussian_blur_support(radius):
+    """
+    Reach in pixels of PIL's GaussianBlur, which runs three extended box blurs per axis.
+    Each box pass has radius l + a (0 <= a < 1) with l = floor((sqrt(4 * radius^2 + 1) - 1) / 2)
+    and so touches l + 1 pixels on each side.
+    """
+    box_radius = math.floor((math.sqrt(4 * radius * radius + 1) - 1) / 2)
+    return 3 * (box_radius + 1)
+
+
+def merge_boxes(boxes):
+    """
+    Merge overlapping (x0, y0, x1, y1) boxes until every pair is disjoint.
+
+    Returns:
+        List of merged boxes, each the bounding box of the boxes it absorbed
+    """
+    merged = []
+    for box in sorted(boxes):
+        x0, y0, x1, y1 = box
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(merged) - 1, -1, -1):
+                mx0, my0, mx1, my1 = merged[i]
+                if mx0 < x1 and x0 < mx1 and my0 < y1 and y0 < my1:
+                    x0, y0, x1, y1 = min(x0, mx0), min(y0, my0), max(x1, mx1), max(y1, my1)
+                    del merged[i]
+                    changed = True
+        merged.append((x0, y0, x1, y1))
+    return merged
+
+
+class FrameRenderer:
+    """Renders frames of a solved animation into uint8 arrays or float output frames"""
+
+    def __init__(self, draw_shape, positions, rotations, visible, frame_width, frame_height, shape,
+                 shape_size, shape_color, bg_color, border_width=0, border_color=(255, 255, 255),
+                 blur_radius=0.0, render_engine='pil', coverage=None, mask_mode='antialiased',
+                 output_precision='float32'):
+        """
+        Args:
+            draw_shape: FL_PathAnimator.draw_shape (bound method)
+            positions: (F, P, 2) shape centers from FL_PathAnimator.solve_positions
+            rotations: (F, P) rotations in degrees
+            visible: (F, P) visibility table
+            frame_width, frame_height: Output frame size
+            shape, shape_size, shape_color, bg_color, border_width, border_color: Shape settings
+            blur_radius: Gaussian blur radius applied to each frame
+            render_engine: 'pil', 'sdf' or 'sprite'
+            coverage: Optional cached (F, H, W, 2) uint8 coverage stack of the same
+                geometry, used instead of drawing
+            mask_mode: One of MASK_MODES; 'effects' blurs the mask with blur_radius too
+            output_precision: Key of OUTPUT_DTYPES, the dtype of the image and mask outputs
+        """
+        # Plain-data arguments, enough to rebuild the renderer in a worker process
+        self.settings = dict(positions=positions, rotations=rotations, visible=visible, frame_width=frame_width,
+                             frame_height=frame_height, shape=shape, shape_size=shape_size,
+                             shape_color=shape_color, bg_color=bg_color, border_width=border_width,
+                             border_color=border_color, blur_radius=blur_radius, render_engine=render_engine,
+                             coverage=coverage, mask_mode=mask_mode, output_precision=output_precision)
+        self.draw_shape = draw_shape
+        self.positions = positions
+        self.rotations = rotations
+        self.visible = visible
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.shape = shape
+        self.shape_size = shape_size
+        self.shape_color = shape_color
+        self.bg_color = bg_color
+        self.border_width = border_width
+        self.border_color = border_color
+        self.blur_radius = blur_radius
+        self.render_engine = render_engine
+        self.coverage_stack = coverage
+        self.mask_mode = mask_mode
+        self.output_dtype = np.dtype(OUTPUT_DTYPES[output_precision])
+        self.mask_table = MASK_TABLES[mask_mode].astype(self.output_dtype)
+        self.colors = colorize_table(shape_color, bg_color, border_color)
+        self.local = threading.local()
+
+        if render_engine == 'sprite':
+            # Circles and squares have no polygon work to save, draw them directly
+            self.render_engine = 'pil'
+            if shape in SPRITE_SHAPES:
+                atlas = SpriteAtlas(draw_shape, shape, shape_size, LABEL_FILL, border_width, LABEL_BORDER)
+                if atlas.fits(positions, rotations, visible):
+                    self.render_engine = 'sprite'
+                    self.atlas = atlas
+                    # Quantize every stamp once: (F, P, 5) of pixel, subpixel phase and rotation index
+                    self.sprite_table = np.stack(
+                        atlas.quantize(positions[..., 0], positions[..., 1], rotations), axis=-1)
+
+        # Shape pixels lie within shape_radius of the center pixel for every engine
+        extent = shape_size / 2 * (math.sqrt(2) if shape in ('triangle', 'square') else 1.0)
+        self.shape_radius = int(math.ceil(extent + 2)) + border_width
+        self.shape_centers = np.floor(positions).astype(np.int64)
+
+        if blur_radius > 0:
+            self.blur_filter = ImageFilter.GaussianBlur(blur_radius)
+            # Outside blur_margin of every shape the blurred frame is exactly bg_color
+            self.blur_margin = self.shape_radius + gaussian_blur_support(blur_radius)
+
+        # Frames with the same state as an earlier frame are copied from it
+        self.frame_sources = self.plan_frame_sources()
+        self.period = self.plan_period()
+
+        # Label drawing engines start frames from a cached layer of their static shapes,
+        # planned when the first frame is drawn (renders from cached coverage never are)
+        self.static_ids = None
+        self.static_planned = self.render_engine not in ('pil', 'sprite') or coverage is not None
+        self.static_layers = OrderedDict()
+        self.static_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Thread-local canvases stay with the thread that made them
+        state = self.__dict__.copy()
+        del state['local']
+        del state['static_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.local = threading.local()
+        self.static_lock = threading.Lock()
+
+    @property
+    def frame_count(self):
+        return len(self.visible)
+
+    def thread_buffer(self, name, shape, dtype):
+        """Scratch array owned by the calling thread, reused across frames"""
+        buffer = getattr(self.local, name, None)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            setattr(self.local, name, buffer)
+        return buffer
+
+    def render_sdf_coverage(self, frames, shape_only=False):
+        """
+        Rasterize the coverage of the given frames (index array) in one batched SDF pass,
+        as (N, H, W, 2) uint8, or as the (N, H, W) shape coverage alone
+        """
+        with stage('draw'):
+            if shape_only:
+                return render_sdf_frames(self.positions[frames], self.rotations[frames], self.visible[frames],
+                                         self.frame_width, self.frame_height, self.shape, self.shape_size,
+                                         (255,), (0,), self.border_width, (255,))[..., 0]
+            return render_sdf_frames(self.positions[frames], self.rotations[frames], self.visible[frames],
+                                     self.frame_width, self.frame_height, self.shape, self.shape_size,
+                                     (255, 0), (0, 0), self.border_width, (0, 255))
+
+    def plan_frame_sources(self):
+        """
+        Find the frames that render identically: the same paths visible, each in the
+        same pose (sprite stamp, or position and rotation where the shape depends on it).
+
+        Returns:
+            (F,) int64, the first frame with the state of each frame
+        """
+        rotating = self.render_engine != 'sprite' and self.shape in ROTATING_SHAPES
+        sources = np.empty(self.frame_count, dtype=np.int64)
+        first_frames = {}
+        for frame in range(self.frame_count):
+            visible = self.visible[frame]
+            state = hashlib.blake2b(visible.tobytes(), digest_size=16)
+            if self.render_engine == 'sprite':
+                state.update(self.sprite_table[frame][visible].tobytes())
+            else:
+                # Adding zero turns -0.0 into 0.0, which draws the same
+                state.update((self.positions[frame][visible] + 0.0).tobytes())
+                if rotating:
+                    state.update((self.rotations[frame][visible] + 0.0).tobytes())
+            sources[frame] = first_frames.setdefault(state.digest(), frame)
+        return sources
+
+    def range_sources(self, start, stop):
+        """(stop - start,) index of the first frame of [start, stop) with the state of each frame"""
+        _, first, inverse = np.unique(self.frame_sources[start:stop], return_index=True, return_inverse=True)
+        return first[inverse.reshape(-1)]
+
+    def plan_period(self):
+        """
+        Shortest period of the frame states: the p for which every frame from p on has
+        the state of the frame p before it, or None when the states do not repeat.
+        """
+        sources = self.frame_sources
+        for period in (np.flatnonzero(sources[1:] == sources[0]) + 1).tolist():
+            if sources[-1] == sources[-1 - period] and np.array_equal(sources[period:], sources[:-period]):
+                return period
+        return None
+
+    def repeated_frames(self, start, stop):
+        """(stop - start,) bool, True for frames with the same state as the frame before them"""
+        repeats = np.zeros(stop - start, dtype=bool)
+        first = max(start, 1)
+        repeats[first - start:] = self.frame_sources[first:stop] == self.frame_sources[first - 1:stop - 1]
+        return repeats
+
+    def plan_static_layers(self):
+        """
+        Split every frame's shapes into a static base layer and the shapes drawn per frame.
+
+        A visible shape is static when its pose (sprite stamp, or position and rotation
+        where the shape depends on it) recurs in other frames. It joins the base layer
+        unless a per-frame shape earlier in draw order overlaps it, since that shape is
+        drawn over the layer but belongs underneath. Frames with the same base layer
+        contents share one layer. Only the first frame of each frame state is planned,
+        its repeats take the same layer.
+
+        Returns:
+            static_ids: (F,) int64 layer index per frame, -1 for frames drawn from scratch
+            static_table: (F, P) bool, the paths each frame takes from its layer
+            static_frames: List with one frame per layer to draw it from
+        """
+        frame_count, num_paths = self.visible.shape
+        static_ids = np.full(frame_count, -1, dtype=np.int64)
+        static_table = np.zeros((frame_count, num_paths), dtype=bool)
+        static_frames = []
+
+        # Number every (path, pose) pair across all frames at once
+        frames, paths = np.nonzero(self.visible)
+        if self.render_engine == 'sprite':
+            poses = self.sprite_table[frames, paths]
+        elif self.shape in ROTATING_SHAPES:
+            poses = np.column_stack([self.positions[frames, paths], self.rotations[frames, paths]]) + 0.0
+        else:
+            poses = self.positions[frames, paths] + 0.0
+        path_poses = np.column_stack([paths, poses])
+        order = np.lexsort(path_poses.T[::-1])
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = (path_poses[order[1:]] != path_poses[order[:-1]]).any(axis=1)
+        inverse = np.empty(len(order), dtype=np.int64)
+        inverse[order] = np.cumsum(starts) - 1
+        counts = np.bincount(inverse)
+        static = np.zeros((frame_count, num_paths), dtype=bool)
+        static[frames, paths] = counts[inverse] > 1
+        pose_ids = np.zeros((frame_count, num_paths), dtype=np.int64)
+        pose_ids[frames, paths] = inverse
+
+        # Frames rendered per state, a layer pays off once it is shared by two of them
+        weights = np.bincount(self.frame_sources, minlength=frame_count)
+        candidates = np.flatnonzero(static.any(axis=1) & (weights > 0))
+        if weights[candidates].sum() < 2:
+            return static_ids, static_table, static_frames
+
+        # Shapes whose boxes are this far apart on an axis cannot share a pixel
+        reach = 2 * self.shape_radius + 1
+        keys = {}
+        for frame in candidates.tolist():
+            low, high = self.overlapping_paths(frame, reach)
+            layer = static[frame].copy()
+            # A static shape under an earlier per-frame shape is drawn per frame too, which can
+            # uncover later static shapes in turn
+            while True:
+                conflict = layer[high] & ~layer[low]
+                if not conflict.any():
+                    break
+                layer[high[conflict]] = False
+            layer_paths = np.flatnonzero(layer)
+            if len(layer_paths):
+                static_table[frame] = layer
+                keys[frame] = (layer_paths.tobytes(), pose_ids[frame, layer_paths].tobytes())
+
+        # Only layers shared by several frames save any drawing
+        counts = {}
+        for frame, key in keys.items():
+            counts[key] = counts.get(key, 0) + weights[frame]
+        layer_ids = {}
+        for frame, key in keys.items():
+            if counts[key] < 2:
+                static_table[frame] = False
+                continue
+            if key not in layer_ids:
+                layer_ids[key] = len(static_frames)
+                static_frames.append(frame)
+            static_ids[frame] = layer_ids[key]
+        return static_ids[self.frame_sources], static_table[self.frame_sources], static_frames
+
+    def overlapping_paths(self, frame, reach):
+        """
+        Pairs of visible shapes in one frame whose boxes may share a pixel, found by sorting
+        their centers on x and sweeping a window of reach pixels.
+
+        Returns:
+            (low, high): (N,) int64 path indices of each pair, low < high
+        """
+        paths = np.flatnonzero(self.visible[frame])
+        centers = self.shape_centers[frame, paths]
+        order = np.argsort(centers[:, 0], kind='stable')
+        paths = paths[order]
+        centers = centers[order]
+        index = np.arange(len(paths))
+        # Shapes after each one in x order and less than reach to its right
+        counts = np.searchsorted(centers[:, 0], centers[:, 0] + reach) - index - 1
+        first = np.repeat(index, counts)
+        second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        near = np.abs(centers[first, 1] - centers[second, 1]) < reach
+        first, second = paths[first[near]], paths[second[near]]
+        return np.minimum(first, second), np.maximum(first, second)
+
+    def static_layer(self, layer_id):
+        """The (H, W) uint8 label image of a static base layer, drawn on first use"""
+        with self.static_lock:
+            layer = self.static_layers.get(layer_id)
+            if layer is not None:
+                self.static_layers.move_to_end(layer_id)
+                return layer
+
+            frame = self.static_frames[layer_id]
+            with stage('static_layer'):
+                layer = self.draw_paths(frame, np.flatnonzero(self.static_table[frame])).copy()
+            self.static_layers[layer_id] = layer
+            while len(self.static_layers) > STATIC_LAYER_CACHE_SIZE:
+                self.static_layers.popitem(last=False)
+            return layer
+
+    def draw_labels(self, frame):
+        """
+        Draw one frame as an (H, W) uint8 label image: 0 background, LABEL_FILL and
+        LABEL_BORDER where the shapes' fill and border pixels are.
+        """
+        if not self.static_planned:
+            with self.static_lock:
+                if not self.static_planned:
+                    with stage('plan_static'):
+                        self.static_ids, self.static_table, self.static_frames = self.plan_static_layers()
+                    self.static_planned = True
+        layer_id = -1 if self.static_ids is None else self.static_ids[frame]
+        if layer_id < 0:
+            with stage('draw'):
+                return self.draw_paths(frame, np.flatnonzero(self.visible[frame]))
+        base = self.static_layer(layer_id)
+        with stage('draw'):
+            return self.draw_paths(frame, np.flatnonzero(self.visible[frame] & ~self.static_table[frame]), base)
+
+    def draw_paths(self, frame, paths, base=None):
+        """
+        Draw the shapes of the given paths in one frame, in order, over a copy of a base
+        label image (or the empty background).
+
+        Returns:
+            (H, W) uint8 label image, a per-thread buffer with the sprite engine
+        """
+        size = (self.frame_width, self.frame_height)
+        if self.render_engine == 'sprite':
+            canvas = self.thread_buffer('labels', (self.frame_height, self.frame_width), np.uint8)
+            if base is None:
+                canvas.fill(0)
+            else:
+                np.copyto(canvas, base)
+            frame_sprites = self.sprite_table[frame].tolist()
+            for path_idx in paths:
+                self.atlas.stamp(canvas, *frame_sprites[path_idx])
+            return canvas
+
+        image = Image.new("L", size, 0) if base is None else Image.frombytes("L", size, base)
+        draw = ImageDraw.Draw(image)
+
+        frame_positions = self.positions[frame].tolist()
+        frame_rotations = self.rotations[frame].tolist()
+
+        # Draw each visible path's shape
+        for path_idx in paths:
+            x, y = frame_positions[path_idx]
+            self.draw_shape(draw, self.shape, x, y, self.shape_size, frame_rotations[path_idx],
+                            LABEL_FILL, self.border_width, LABEL_BORDER)
+        return np.asarray(image)
+
+    def draw_coverage(self, frame, out):
+        """Draw one frame's (H, W, 2) uint8 coverage into out"""
+        if self.render_engine == 'sdf':
+            out[:] = self.render_sdf_coverage([frame])[0]
+        else:
+            np.take(LABEL_COVERAGE, self.draw_labels(frame), axis=0, out=out)
+        return out
+
+    def colorize(self, coverage):
+        """Colors of an (H, W, 2) coverage array as a per-thread (H, W, 3) uint8 array"""
+        rgb = self.thread_buffer('rgb', coverage.shape[:-1] + (3,), np.uint8)
+        return np.take(self.colors, coverage_codes(coverage), axis=0, out=rgb)
+
+    def render_array(self, frame, coverage):
+        """
+        Colorize and blur one frame's coverage.
+
+        Returns:
+            (H, W, 3) uint8 array, possibly a per-thread buffer that the next call
+            on the same thread overwrites
+        """
+        with stage('colorize'):
+            rgb = self.colorize(coverage)
+
+        # Apply blur
+        if self.blur_radius > 0:
+            with stage('blur'):
+                return np.asarray(self.blur(frame, Image.fromarray(rgb)))
+        return rgb
+
+    def blur_regions(self, frame):
+        """
+        Regions of a frame the blur can change: every visible shape's box padded by
+        the blur reach, merged until disjoint. Each region then only sees its own
+        shapes and flat background within the blur reach, so blurring it on its own
+        gives the same pixels as blurring the whole frame.
+
+        Returns:
+            List of (x0, y0, x1, y1) boxes clipped to the frame, or None when they
+            cover too much of the frame to be worth it
+        """
+        margin = self.blur_margin
+        boxes = []
+        for cx, cy in self.shape_centers[frame][self.visible[frame]].tolist():
+            box = (max(cx - margin, 0), max(cy - margin, 0),
+                   min(cx + margin + 1, self.frame_width), min(cy + margin + 1, self.frame_height))
+            if box[0] < box[2] and box[1] < box[3]:
+                boxes.append(box)
+
+        regions = merge_boxes(boxes)
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        if area > BLUR_REGION_MAX_FRACTION * self.frame_width * self.frame_height:
+            return None
+        return regions
+
+    def blur(self, frame, image, background=None):
+        """
+        Gaussian-blur a rendered frame, only around its shapes when they are small enough.
+
+        Args:
+            frame: Frame index
+            image: Rendered RGB frame, or L mask with background 0
+            background: Flat value of the image away from the shapes, bg_color by default
+        """
+        regions = self.blur_regions(frame)
+        if regions is None:
+            return image.filter(self.blur_filter)
+
+        blurred = Image.new(image.mode, image.size, self.bg_color if background is None else background)
+        for region in regions:
+            blurred.paste(image.crop(region).filter(self.blur_filter), region[:2])
+        return blurred
+
+    def render_mask(self, frame, shape):
+        """One frame's 8-bit shape coverage, blurred like the image in 'effects' mode"""
+        if self.mask_mode == 'effects' and self.blur_radius > 0:
+            return np.asarray(self.blur(frame, Image.fromarray(np.ascontiguousarray(shape)), 0))
+        return shape
+
+    def render_into(self, frame, out, out_mask, coverage):
+        """
+        Render one frame from its coverage straight into float outputs.
+
+        Args:
+            frame: Frame index
+            out: (H, W, 3) image of the output dtype (uint8 -> float in one pass), or None
+                to render the mask only
+            out_mask: (H, W) mask of the output dtype from the shape coverage, see MASK_MODES
+            coverage: (H, W, 2) uint8 coverage of the frame
+        """
+        if out is not None:
+            rgb = self.render_array(frame, coverage)
+            with stage('convert'):
+                if self.output_dtype == np.float32:
+                    np.divide(rgb, 255.0, out=out, dtype=np.float32)
+                else:
+                    # Stage in float32 so values round once, torch casts to float16 much faster than NumPy
+                    staging = self.thread_buffer('staging', rgb.shape, np.float32)
+                    np.divide(rgb, 255.0, out=staging, dtype=np.float32)
+                    torch.from_numpy(out).copy_(torch.from_numpy(staging))
+        with stage('mask'):
+            shape = np.take(SHAPE_COVERAGE, coverage_codes(coverage),
+                            out=self.thread_buffer('shape', coverage.shape[:2], np.uint8))
+            np.take(self.mask_table, self.render_mask(frame, shape), out=out_mask)
+
+    def render_mask_range(self, start, stop, out_masks):
+        """
+        Render only the masks of frames [start, stop): single-channel shape coverage
+        straight into (N, H, W) float masks, with no RGB or border work.
+        """
+        firsts = self.range_sources(start, stop)
+        drawn = np.flatnonzero(firsts == np.arange(stop - start))
+        stack = self.coverage_stack
+        if stack is None and self.render_engine == 'sdf':
+            batch = dict(zip(drawn.tolist(), self.render_sdf_coverage(start + drawn, shape_only=True)))
+
+        for index, first in enumerate(firsts.tolist()):
+            if first != index:
+                with stage('copy'):
+                    out_masks[index] = out_masks[first]
+                continue
+            frame = start + index
+            buffer = self.thread_buffer('shape', (self.frame_height, self.frame_width), np.uint8)
+            if stack is not None:
+                shape = np.take(SHAPE_COVERAGE, coverage_codes(stack[frame]), out=buffer)
+            elif self.render_engine == 'sdf':
+                shape = batch[index]
+            else:
+                shape = np.take(LABEL_SHAPE_COVERAGE, self.draw_labels(frame), out=buffer)
+            with stage('mask'):
+                np.take(self.mask_table, self.render_mask(frame, shape), out=out_masks[index])
+
+    def render_range(self, start, stop, out, out_masks, out_coverage=None):
+        """
+        Render frames [start, stop) into (stop - start, ...) image and mask arrays of the output dtype.
+
+        Args:
+            start, stop: Frame range
+            out: (N, H, W, 3) images, or None to render the masks only
+            out_masks: (N, H, W) masks
+            out_coverage: Optional (N, H, W, 2) uint8 array that receives the drawn coverage
+        """
+        if out is None and out_coverage is None:
+            self.render_mask_range(start, stop, out_masks)
+            return
+
+        # Only the first frame of each state in the range is rendered
+        firsts = self.range_sources(start, stop)
+        drawn = np.flatnonzero(firsts == np.arange(stop - start))
+        stack = self.coverage_stack
+        # The SDF engine rasterizes the whole range in one batched pass
+        if stack is None and self.render_engine == 'sdf':
+            batch = dict(zip(drawn.tolist(), self.render_sdf_coverage(start + drawn)))
+
+        for index, first in enumerate(firsts.tolist()):
+            if first != index:
+                with stage('copy'):
+                    for output in (out, out_masks, out_coverage):
+                        if output is not None:
+                            output[index] = output[first]
+                continue
+            frame = start + index
+            if stack is not None:
+                coverage = stack[frame]
+            elif self.render_engine == 'sdf':
+                coverage = batch[index]
+            else:
+                coverage = self.draw_coverage(
+                    frame, self.thread_buffer('coverage', (self.frame_height, self.frame_width, 2), np.uint8))
+            if out_coverage is not None and stack is None:
+                out_coverage[index] = coverage
+            self.render_into(frame, None if out is None else out[index], out_masks[index], coverage)
@@ -0,0 +1,115 @@
+"""
+Memory-mapped output buffers for the FL Path Animator.
+
+For sequences that do not fit in RAM the output tensors can be backed by
+numpy.memmap files in ComfyUI's temp directory. Frames are rendered straight
+into the mapping and the operating system pages them out to disk as needed.
+
+Each file is unlinked once rendering is done where the platform allows it, so
+it disappears with the last tensor that maps it. Files that could not be
+removed (still open on Windows, or left behind by a crash) are evicted by age
+and total size before new ones are created.
+"""
+
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import torch
+
+logger = logging.getLogger("FL_PathAnimator")
+
+MEMMAP_PREFIX = "fl_path_animator_"
+MEMMAP_SUFFIX = ".f32"
+# Outputs above this size switch to memmap in 'auto' mode (MB)
+MEMORY_BUDGET_MB = int(os.environ.get("FL_PATH_ANIMATOR_MEMORY_BUDGET_MB", 4096))
+# Leftover memmap files are evicted beyond this total size (MB) or age (seconds)
+MEMMAP_DISK_BUDGET_MB = int(os.environ.get("FL_PATH_ANIMATOR_MEMMAP_DISK_BUDGET_MB", 65536))
+MEMMAP_MAX_AGE = 24 * 60 * 60
+
+# Files this process is still rendering into, never evicted
+_active_paths = set()
+
+
+def get_memmap_directory():
+    """ComfyUI's temp directory, or the system temp directory outside ComfyUI"""
+    try:
+        import folder_paths
+        base = folder_paths.get_temp_directory()
+    except ImportError:
+        base = tempfile.gettempdir()
+    directory = os.path.join(base, "fl_path_animator")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def memory_budget_bytes():
+    return MEMORY_BUDGET_MB * 1024 * 1024
+
+
+def evict_memmaps(directory, incoming_bytes=0):
+    """
+    Delete leftover memmap files that are too old, then the oldest ones until the
+    files plus incoming_bytes fit in the disk budget. Files still open elsewhere
+    may refuse deletion (Windows); those are skipped.
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if not (name.startswith(MEMMAP_PREFIX) and name.endswith(MEMMAP_SUFFIX)):
+            continue
+        path = os.path.join(directory, name)
+        if path in _active_paths:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    now = time.time()
+    budget = MEMMAP_DISK_BUDGET_MB * 1024 * 1024
+    total = sum(size for _, size, _ in entries) + incoming_bytes
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= MEMMAP_MAX_AGE and total <= budget:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            logger.info(f"Evicted memmap output {path}")
+        except OSError:
+            pass
+
+
+def memmap_empty(shape, dtype=np.float32):
+    """
+    Allocate an uninitialized tensor backed by a new memmap file.
+
+    Returns:
+        (tensor, path): the tensor and the backing file, to pass to release_memmap
+        once nothing needs to open it by name any more
+    """
+    dtype = np.dtype(dtype)
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+    directory = get_memmap_directory()
+    evict_memmaps(directory, nbytes)
+
+    path = os.path.join(directory, f"{MEMMAP_PREFIX}{uuid.uuid4().hex}{MEMMAP_SUFFIX}")
+    _active_paths.add(path)
+    array = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    return torch.from_numpy(array), path
+
+
+def release_memmap(path):
+    """
+    Unlink a memmap file; the mapping stays valid for the tensors that use it and
+    the space is freed with the last of them. Where open files cannot be removed
+    it is left for evict_memmaps.
+    """
+    _active_paths.discard(path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
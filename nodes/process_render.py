@@ -0,0 +1,153 @@
+"""
+Process-pool frame rendering for the FL Path Animator.
+
+PIL's polygon drawing and the per-path Python loop hold the GIL, which caps the
+thread pool on very large or very busy sequences. This backend renders frame
+ranges in worker processes straight into multiprocessing.shared_memory blocks
+(or the memmap files of the memmap output mode) that also back the returned
+image and mask tensors, so nothing is copied back.
+
+Workers are always spawned: ComfyUI has run torch on its intra-op thread pool
+by the time the node renders, and forked children that call torch again can
+deadlock on the pool's inherited locks. A spawned worker cannot import this
+node pack by name when ComfyUI loaded it from a file path, so each one runs
+render_worker.py by path and is sent plain data only (see there). Nor does it
+re-run the parent's __main__ script (ComfyUI's main.py). A worker that fails
+to start or dies raises BrokenProcessPool instead of leaving the render waiting.
+"""
+
+import multiprocessing
+import os
+import queue
+import runpy
+import sys
+import time
+import types
+import weakref
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+from .render_worker import RUN_NAME
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_worker.py')
+# Seconds the workers get to load the node pack and report ready
+WORKER_STARTUP_TIMEOUT = 120.0
+# Seconds between liveness checks while waiting for the workers
+WORKER_POLL_INTERVAL = 0.5
+
+
+def shared_empty(shape, dtype=np.float32):
+    """
+    Allocate an uninitialized tensor backed by a new shared memory block.
+
+    Returns:
+        (tensor, shm): the tensor and the SharedMemory block workers attach to by name.
+        The mapping is closed when the last view of the tensor is released.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    weakref.finalize(array, shm.close)
+    return torch.from_numpy(array), shm
+
+
+@contextmanager
+def hidden_main_module():
+    """
+    Start spawned processes without the parent's __main__ module: spawn re-runs the
+    main script (or module) in every child, and ComfyUI's main.py must not start over.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+class ProcessRenderPool:
+    """Worker processes rendering frame ranges of one FrameRenderer into shared output buffers"""
+
+    def __init__(self, renderer, num_workers, shared, shapes, dtype=np.float32):
+        """
+        Args:
+            renderer: FrameRenderer for the solved animation; each worker rebuilds it from its settings
+            num_workers: Number of worker processes
+            shared: SharedMemory blocks or memmap file paths holding the (N, H, W, 3) image
+                and (N, H, W) mask output buffers; None for an image buffer that is not rendered
+            shapes: Shapes of the output buffers
+            dtype: NumPy dtype of the output buffers
+        """
+        context = multiprocessing.get_context('spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        worker_args = dict(settings=renderer.settings,
+                           outputs=tuple(None if handle is None else ('memmap', handle) if isinstance(handle, str)
+                                         else ('shm', handle.name) for handle in shared),
+                           shapes=tuple(shapes), dtype=np.dtype(dtype), tasks=self.tasks, results=self.results)
+        self.processes = [context.Process(target=runpy.run_path, args=(WORKER_PATH,),
+                                          kwargs={'init_globals': {'worker_args': worker_args},
+                                                  'run_name': RUN_NAME},
+                                          daemon=True)
+                          for _ in range(num_workers)]
+        self.num_workers = num_workers
+        try:
+            with hidden_main_module():
+                for process in self.processes:
+                    process.start()
+            self.wait('ready', num_workers, WORKER_STARTUP_TIMEOUT)
+        except BaseException:
+            self.shutdown()
+            raise
+
+    def wait(self, kind, count, timeout=None):
+        """
+        Collect count messages of the given kind from the workers.
+
+        Raises:
+            BrokenProcessPool: A worker failed to start, died, or none reported within timeout
+            RuntimeError: A frame range failed to render
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while count > 0:
+            try:
+                message, value = self.results.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                dead = [process.exitcode for process in self.processes if process.exitcode is not None]
+                if dead:
+                    raise BrokenProcessPool(f"{len(dead)} render worker(s) exited (exit codes {dead})")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise BrokenProcessPool(f"Render workers did not start within {timeout:.0f} s")
+                continue
+            if message == 'error':
+                if kind == 'ready':
+                    raise BrokenProcessPool(f"A render worker failed to start:\n{value}")
+                raise RuntimeError(f"A render worker failed:\n{value}")
+            count -= 1
+
+    def render(self, start, stop, out_start=0):
+        """Render frames [start, stop) into the buffers from index out_start and wait for them"""
+        step = max(1, -(-(stop - start) // (self.num_workers * 4)))
+        ranges = [(first, min(first + step, stop), out_start + first - start) for first in range(start, stop, step)]
+        for task in ranges:
+            self.tasks.put(task)
+        self.wait('done', len(ranges))
+
+    def shutdown(self):
+        for process in self.processes:
+            if process.is_alive():
+                self.tasks.put(None)
+        for process in self.processes:
+            if process.pid is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        for channel in (self.tasks, self.results):
+            channel.close()
+            channel.cancel_join_thread()
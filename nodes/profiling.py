@@ -0,0 +1,174 @@
+"""
+Per-stage profiling for the FL Path Animator.
+
+With FL_PATH_ANIMATOR_PROFILE set, every animate_paths call times its stages
+(parsing, path scaling, solving, drawing, blur, trail, conversion, coordinate
+generation, ...). Each stage records its wall time, call count and the bytes
+allocated while it ran. The run is written as a Chrome trace-event JSON file
+(open it in chrome://tracing or https://ui.perfetto.dev), and a one-line
+summary is logged through the FL_PathAnimator logger.
+
+Allocated bytes are the growth of the memory traced by tracemalloc (NumPy and
+Python objects) plus the torch, shared memory and memmap buffers reported with
+allocated(). tracemalloc is process-wide, so stages running concurrently on
+worker threads share their counts. It also slows allocation-heavy stages down,
+so compare timings between profiled runs. Stages inside process backend
+workers are not recorded; the parent times the whole render instead.
+
+Configuration (environment):
+    FL_PATH_ANIMATOR_PROFILE  1 writes traces to ComfyUI's temp directory, any other
+                              non-empty value is the directory to write them to;
+                              unset or 0 disables profiling (default)
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("FL_PathAnimator")
+
+PROFILE = os.environ.get("FL_PATH_ANIMATOR_PROFILE", "")
+TRACE_PREFIX = "fl_path_animator_trace_"
+
+# Profiler of the animate_paths call in progress, None while profiling is off
+_profiler = None
+# Numbers the trace files of calls within the same second
+_trace_numbers = itertools.count()
+
+
+def profiling_enabled():
+    return PROFILE not in ("", "0")
+
+
+def get_trace_directory():
+    """FL_PATH_ANIMATOR_PROFILE when it names a directory, else ComfyUI's temp directory"""
+    if PROFILE != "1":
+        directory = PROFILE
+    else:
+        from .memmap_output import get_memmap_directory
+        directory = get_memmap_directory()
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class Profiler:
+    """Wall time, call counts and allocated bytes of named stages, and their trace events"""
+
+    def __init__(self, name):
+        self.name = name
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.events = []
+        # Stage name -> [calls, nanoseconds, bytes], in order of first use
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        """Record the enclosed block as one call of a stage"""
+        open_stages = getattr(self.local, 'stages', None)
+        if open_stages is None:
+            open_stages = self.local.stages = []
+        # Bytes reported with allocated() while the stage is open
+        open_stages.append(0)
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            reported = open_stages.pop()
+            # Traced growth already shows up in the enclosing stage, reported buffers are passed on
+            if open_stages:
+                open_stages[-1] += reported
+            allocated = max(0, tracemalloc.get_traced_memory()[0] - start_bytes) + reported
+            self.record(name, start, end, allocated)
+
+    def allocated(self, nbytes):
+        """Count a buffer tracemalloc cannot see towards the innermost open stage"""
+        open_stages = getattr(self.local, 'stages', None)
+        if open_stages:
+            open_stages[-1] += nbytes
+
+    def record(self, name, start, end, allocated):
+        event = {
+            "name": name, "ph": "X", "pid": self.pid, "tid": threading.get_ident(),
+            "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000,
+            "args": {"bytes": allocated},
+        }
+        with self.lock:
+            self.events.append(event)
+            totals = self.totals.setdefault(name, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += end - start
+            totals[2] += allocated
+
+    def summary(self):
+        """One line with every stage's total time, calls beyond one and allocated megabytes"""
+        parts = []
+        for name, (calls, duration, allocated) in self.totals.items():
+            part = f"{name} {duration / 1e9:.3f}s"
+            if calls > 1:
+                part += f" x{calls}"
+            if allocated >= 2 ** 20:
+                part += f" {allocated / 2 ** 20:.0f}MB"
+            parts.append(part)
+        return " | ".join(parts)
+
+    def write_trace(self, directory):
+        """Write the Chrome trace-event JSON file and return its path"""
+        name = f"{TRACE_PREFIX}{time.strftime('%Y%m%d_%H%M%S')}_{self.pid}_{next(_trace_numbers)}.json"
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+def stage(name):
+    """Time a stage of the profiled call in progress; a no-op context when profiling is off"""
+    profiler = _profiler
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def allocated(nbytes):
+    """Report a buffer allocated outside tracemalloc's view (torch, shared memory, memmap)"""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.allocated(nbytes)
+
+
+@contextmanager
+def profile(name):
+    """
+    Profile the enclosed call as one top-level stage when FL_PATH_ANIMATOR_PROFILE is set,
+    then write its trace and log the summary.
+    """
+    global _profiler
+    if not profiling_enabled() or _profiler is not None:
+        yield
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = _profiler = Profiler(name)
+    try:
+        with profiler.stage(name):
+            yield
+    finally:
+        _profiler = None
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            trace = profiler.write_trace(get_trace_directory())
+        except OSError as e:
+            trace = f"not written ({e})"
+        logger.info(f"Profile: {profiler.summary()} | trace {trace}")
@@ -0,0 +1,319 @@
+"""
+Content-addressed result cache for FL_PathAnimator.animate_paths.
+
+Renders are keyed by a SHA-256 of every input that affects the output, with
+paths_data reduced to its render-relevant fields (see canonical_paths) so
+formatting and cosmetic edits in the editor do not matter. Results
+live in an in-memory LRU bounded by bytes and entries, and can optionally spill
+to a directory on disk so repeat runs after a restart also skip rendering.
+
+On disk each entry is a folder holding the coordinate string and the image and
+mask stacks, as raw uint8 .npy when the frames are exactly on the 1/255 grid
+(no trail or torch blur) and as compressed float .npz otherwise. Raw stacks of
+float16 renders are marked by a .float16.npy suffix.
+
+A second, memory-only cache holds the color-independent coverage stacks of
+recent renders, keyed by the geometric inputs alone (see coverage_key), so a
+render that only changes colors, blur or trail skips drawing the shapes.
+
+Both caches are off by default: they live in module globals that ComfyUI's own
+output cache and its free-memory / unload actions never reach, so whatever they
+hold stays pinned in RAM until the process exits. Give them a budget to opt in.
+
+Configuration (environment):
+    FL_PATH_ANIMATOR_CACHE_MB       In-memory budget, 0 keeps nothing in memory (default 0)
+    FL_PATH_ANIMATOR_CACHE_ENTRIES  In-memory entry limit (default 8)
+    FL_PATH_ANIMATOR_CACHE_DIR      Spill directory, unset keeps the cache in memory only; set
+                                    alone it caches on disk without holding results in memory
+    FL_PATH_ANIMATOR_CACHE_DISK_MB  Spill directory budget (default 16384)
+    FL_PATH_ANIMATOR_COVERAGE_CACHE_MB  Coverage cache budget, 0 disables it (default 0)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+logger = logging.getLogger("FL_PathAnimator")
+
+CACHE_MAX_MB = int(os.environ.get("FL_PATH_ANIMATOR_CACHE_MB", 0))
+CACHE_MAX_ENTRIES = int(os.environ.get("FL_PATH_ANIMATOR_CACHE_ENTRIES", 8))
+CACHE_DIR = os.environ.get("FL_PATH_ANIMATOR_CACHE_DIR", "")
+CACHE_DISK_MB = int(os.environ.get("FL_PATH_ANIMATOR_CACHE_DISK_MB", 16384))
+COVERAGE_CACHE_MB = int(os.environ.get("FL_PATH_ANIMATOR_COVERAGE_CACHE_MB", 0))
+COVERAGE_CACHE_ENTRIES = 4
+
+# Bump when rendering changes so stale disk entries are not reused
+CACHE_VERSION = 3
+
+# Inputs that decide a render's outputs. num_threads, parallel_backend and output_mode only
+# change how it runs; render_mode and the prompt only decide mask_only, which is keyed instead
+CACHE_INPUTS = ('frame_width', 'frame_height', 'frame_count', 'shape', 'shape_size', 'shape_color', 'bg_color',
+                'blur_radius', 'trail_length', 'rotation_speed', 'border_width', 'border_color', 'paths_data',
+                'start_time_percent', 'end_time_percent', 'override_path_length', 'path_length_multiplier',
+                'render_engine', 'blur_engine', 'mask_mode', 'mask_only', 'output_precision', 'loop_count',
+                'ping_pong')
+
+# Inputs applied after the coverage stage; renders differing only in these share coverage
+COVERAGE_IGNORED_INPUTS = ('shape_color', 'bg_color', 'border_color', 'blur_radius', 'trail_length',
+                           'blur_engine', 'mask_mode', 'mask_only', 'output_precision')
+COVERAGE_INPUTS = tuple(name for name in CACHE_INPUTS if name not in COVERAGE_IGNORED_INPUTS)
+
+# Path fields the renderer reads, with their defaults; id, name, color and the editor's
+# generationParams, direction or background_image never reach a frame
+PATH_RENDER_FIELDS = {
+    'isSinglePoint': False,
+    'startTime': 0.0,
+    'endTime': 1.0,
+    'interpolation': 'linear',
+    'visibilityMode': 'pop',
+}
+
+
+def canonical_paths(paths_data):
+    """
+    Reduce a paths_data JSON string to the data that affects rendering: the canvas
+    size and, per path in order, its exact points and its timing, interpolation,
+    visibility and single-point flag (missing fields take the renderer's defaults).
+
+    Returns:
+        JSON-serializable object, or the string itself when it is not valid paths JSON
+    """
+    try:
+        paths_obj = json.loads(paths_data)
+        paths = []
+        for path in paths_obj.get('paths', []):
+            canonical = {field: path.get(field, default) for field, default in PATH_RENDER_FIELDS.items()}
+            canonical['points'] = [[point['x'], point['y']] for point in path.get('points', [])]
+            paths.append(canonical)
+        return {'paths': paths, 'canvas_size': paths_obj.get('canvas_size')}
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError):
+        return paths_data
+
+
+def cache_key(inputs, names=CACHE_INPUTS):
+    """
+    Stable hash of the node inputs.
+
+    Args:
+        inputs: Dict holding at least the named arguments; paths_data is hashed in canonical form
+        names: Inputs to hash, anything else in inputs is left out
+
+    Returns:
+        Hex digest string
+    """
+    canonical = {name: inputs[name] for name in names}
+    if isinstance(canonical.get('paths_data'), str):
+        canonical['paths_data'] = canonical_paths(canonical['paths_data'])
+    payload = json.dumps({'version': CACHE_VERSION, 'inputs': canonical}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def coverage_key(inputs):
+    """Stable hash of the inputs that shape the coverage stage, see cache_key"""
+    return cache_key(inputs, COVERAGE_INPUTS)
+
+
+def result_bytes(result):
+    """Bytes held by a cached value (a result tuple or a single array), counting shared tensor storage once"""
+    values = result if isinstance(result, tuple) else (result,)
+    size = 0
+    storages = set()
+    for value in values:
+        if isinstance(value, torch.Tensor):
+            storage = value.untyped_storage()
+            if storage.data_ptr() not in storages:
+                storages.add(storage.data_ptr())
+                size += storage.nbytes()
+        elif isinstance(value, np.ndarray):
+            size += value.nbytes
+    return size
+
+
+def is_mask_view(images, masks):
+    """True for the grayscale image view of the masks returned by mask-only renders"""
+    return images.untyped_storage().data_ptr() == masks.untyped_storage().data_ptr()
+
+
+def restore_quantized(quantized, dtype=np.float32):
+    """Float frames of uint8 frames: value / 255 in float32, rounded to dtype like the renderer does"""
+    restored = np.divide(quantized, 255.0, dtype=np.float32)
+    return restored if restored.dtype == dtype else restored.astype(dtype)
+
+
+def quantize_exact(array):
+    """Return the uint8 frames if restore_quantized reproduces the float frames exactly, else None"""
+    quantized = np.rint(np.multiply(array, 255.0, dtype=np.float32)).astype(np.uint8)
+    return quantized if np.array_equal(restore_quantized(quantized, array.dtype), array) else None
+
+
+def raw_stack_file(name, dtype):
+    """File name of a raw uint8 stack that restores to dtype"""
+    return f"{name}.npy" if np.dtype(dtype) == np.float32 else f"{name}.{np.dtype(dtype).name}.npy"
+
+
+class RenderCache:
+    """In-memory LRU of render results (or coverage stacks) with an optional on-disk spill"""
+
+    def __init__(self, max_bytes, max_entries, directory="", max_disk_bytes=0):
+        """
+        Args:
+            max_bytes: In-memory budget; 0 keeps nothing in memory, which disables the
+                cache unless it has a spill directory
+            max_entries: In-memory entry limit
+            directory: Spill directory, empty for memory only
+            max_disk_bytes: Spill directory budget
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return (self.max_bytes > 0 and self.max_entries > 0) or bool(self.directory)
+
+    def get(self, key):
+        """Return the cached (images, masks, coordinates) or coverage stack for a key, or None"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                return result
+
+        result = self.load(key)
+        if result is not None:
+            self.remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """Cache a (images, masks, coordinates) result in memory and on disk, or a coverage stack in memory"""
+        if not self.enabled:
+            return
+        self.remember(key, result)
+        self.save(key, result)
+
+    def remember(self, key, result):
+        size = result_bytes(result)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = result
+            self.cached_bytes += size
+            while self.cached_bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, old = self.entries.popitem(last=False)
+                self.cached_bytes -= result_bytes(old)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.cached_bytes = 0
+
+    def entry_directory(self, key):
+        return os.path.join(self.directory, key)
+
+    def save(self, key, result):
+        """Write a result to the spill directory (atomically via a temporary folder)"""
+        if not self.directory:
+            return
+        path = self.entry_directory(key)
+        if os.path.isdir(path):
+            return
+
+        images, masks, coordinates = result
+        staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(staging, exist_ok=True)
+            # Mask-only images are rebuilt from the masks on load
+            stacks = (('masks', masks),) if is_mask_view(images, masks) else (('images', images), ('masks', masks))
+            for name, tensor in stacks:
+                array = tensor.numpy()
+                quantized = quantize_exact(array)
+                if quantized is not None:
+                    np.save(os.path.join(staging, raw_stack_file(name, array.dtype)), quantized)
+                else:
+                    np.savez_compressed(os.path.join(staging, f"{name}.npz"), frames=array)
+            with open(os.path.join(staging, "coordinates.json"), "w", encoding="utf-8") as f:
+                f.write(coordinates)
+            os.replace(staging, path)
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.evict_disk()
+
+    def load(self, key):
+        """Read a result from the spill directory, or None"""
+        if not self.directory:
+            return None
+        path = self.entry_directory(key)
+        if not os.path.isdir(path):
+            return None
+
+        try:
+            stacks = {}
+            for name in ('images', 'masks'):
+                raw = [(dtype, os.path.join(path, raw_stack_file(name, dtype))) for dtype in (np.float32, np.float16)]
+                raw = [(dtype, file) for dtype, file in raw if os.path.exists(file)]
+                archive_path = os.path.join(path, f"{name}.npz")
+                if raw:
+                    dtype, file = raw[0]
+                    stacks[name] = torch.from_numpy(restore_quantized(np.load(file), dtype))
+                elif name == 'masks' or os.path.exists(archive_path):
+                    with np.load(archive_path) as archive:
+                        stacks[name] = torch.from_numpy(archive['frames'])
+            with open(os.path.join(path, "coordinates.json"), encoding="utf-8") as f:
+                coordinates = f.read()
+            # Touch the entry so disk eviction is least recently used
+            os.utime(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable render cache entry {key}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        masks = stacks['masks']
+        images = stacks.get('images')
+        if images is None:
+            images = masks.unsqueeze(-1).expand(-1, -1, -1, 3)
+        return images, masks, coordinates
+
+    def evict_disk(self):
+        """Remove the least recently used spill entries beyond the disk budget"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+render_cache = RenderCache(CACHE_MAX_MB * 1024 * 1024, CACHE_MAX_ENTRIES, CACHE_DIR, CACHE_DISK_MB * 1024 * 1024)
+if CACHE_DIR:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+# (F, H, W, 2) uint8 coverage stacks, memory only
+coverage_cache = RenderCache(COVERAGE_CACHE_MB * 1024 * 1024, COVERAGE_CACHE_ENTRIES)
@@ -0,0 +1,101 @@
+"""
+Worker process entry point of the FL Path Animator's process backend.
+
+ComfyUI loads custom nodes from a file path under their folder name, which a
+fresh interpreter cannot import, so a spawned worker cannot unpickle anything
+that refers to this node pack's modules. process_render therefore starts each
+worker with runpy.run_path on this file and sends it plain data only: the
+FrameRenderer settings, the names of the shared output buffers and two queues.
+The worker loads the nodes package from this file's directory under a private
+name, rebuilds the renderer and renders the frame ranges it is sent.
+
+Messages on the result queue are ('ready', pid), ('done', frames) and
+('error', traceback).
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# run_name process_render starts this file with; worker_args holds the arguments of main()
+RUN_NAME = '__fl_path_animator_render_worker__'
+# Module name the worker loads the nodes package under
+PACKAGE = 'fl_path_animator_render_worker'
+
+
+def load_package():
+    """The nodes package, loaded by file path without running its __init__"""
+    if PACKAGE not in sys.modules:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        spec = importlib.util.spec_from_file_location(PACKAGE, os.path.join(directory, '__init__.py'),
+                                                      submodule_search_locations=[directory])
+        sys.modules[PACKAGE] = importlib.util.module_from_spec(spec)
+    return sys.modules[PACKAGE]
+
+
+def attach(outputs, shapes, dtype):
+    """
+    Map the shared output buffers.
+
+    Returns:
+        (arrays, blocks): one array or None per output, and the SharedMemory blocks to close
+    """
+    arrays, blocks = [], []
+    for output, shape in zip(outputs, shapes):
+        if output is None:
+            arrays.append(None)
+        elif output[0] == 'memmap':
+            arrays.append(np.memmap(output[1], dtype=dtype, mode='r+', shape=shape))
+        else:
+            block = shared_memory.SharedMemory(name=output[1])
+            blocks.append(block)
+            arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    return arrays, blocks
+
+
+def main(settings, outputs, shapes, dtype, tasks, results):
+    """
+    Render frame ranges until the task queue yields None.
+
+    Args:
+        settings: FrameRenderer.settings of the parent's renderer
+        outputs: ('shm', name) or ('memmap', path) of the (N, H, W, 3) image and (N, H, W)
+            mask buffers; None for an image buffer that is not rendered
+        shapes, dtype: Shapes and NumPy dtype of the output buffers
+        tasks: Queue of (start, stop, out_start) frame ranges
+        results: Queue of the messages listed in the module docstring
+    """
+    try:
+        load_package()
+        nodes = importlib.import_module(PACKAGE + '.FL_PathAnimator')
+        frame_renderer = importlib.import_module(PACKAGE + '.frame_renderer')
+        renderer = frame_renderer.FrameRenderer(nodes.FL_PathAnimator().draw_shape, **settings)
+        arrays, blocks = attach(outputs, shapes, dtype)
+    except BaseException:
+        results.put(('error', traceback.format_exc()))
+        return
+    results.put(('ready', os.getpid()))
+
+    try:
+        for start, stop, out_start in iter(tasks.get, None):
+            try:
+                renderer.render_range(start, stop, *(None if array is None else
+                                                     array[out_start:out_start + stop - start]
+                                                     for array in arrays))
+            except Exception:
+                results.put(('error', traceback.format_exc()))
+            else:
+                results.put(('done', stop - start))
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+if __name__ == RUN_NAME:
+    main(**worker_args)  # noqa: F821 (set by runpy.run_path's init_globals)
@@ -0,0 +1,176 @@
+"""
+Sprite atlas for the FL Path Animator 'sprite' render engine.
+
+Shape size, type and border are constant for a whole render, only the
+position and rotation change. Polygon shapes are rasterized once per quantized
+rotation angle and subpixel phase with draw_shape, then stamped into the
+single-channel label frame instead of re-running rotate_points, the hexagon/star
+trig and the polygon fill for every frame and path.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Shapes that benefit from sprites; circles and squares are single PIL primitives without trig
+SPRITE_SHAPES = ('triangle', 'hexagon', 'star')
+# Subpixel phases per axis
+SPRITE_SUBPIXEL_STEPS = 4
+# Upper bound for cached sprite memory (bytes), least recently used sprites are evicted
+SPRITE_ATLAS_BYTES = 512 * 1024 * 1024
+
+# Rotational symmetry of each shape in degrees
+SHAPE_SYMMETRY = {
+    'triangle': 360.0,
+    'hexagon': 60.0,
+    'star': 72.0,
+}
+
+
+class SpriteAtlas:
+    """Pre-rasterized single-channel shape sprites keyed by quantized rotation and subpixel phase"""
+
+    def __init__(self, draw_shape, shape, shape_size, fill_value, border_width=0, border_value=255,
+                 subpixel_steps=SPRITE_SUBPIXEL_STEPS, max_bytes=SPRITE_ATLAS_BYTES):
+        """
+        Args:
+            draw_shape: FL_PathAnimator.draw_shape (bound method) used to rasterize sprites
+            shape, shape_size, border_width: Shape settings
+            fill_value, border_value: 8-bit values drawn for the fill and border pixels
+            subpixel_steps: Subpixel phases per axis
+            max_bytes: Memory budget of the atlas
+        """
+        self.draw_shape = draw_shape
+        self.shape = shape
+        self.shape_size = shape_size
+        self.fill_value = fill_value
+        self.border_width = border_width
+        self.border_value = border_value
+        self.subpixel_steps = subpixel_steps
+        self.max_bytes = max_bytes
+
+        # Sprite margin around the center: rotated triangle corners reach half_size * sqrt(2)
+        outer_radius = shape_size / 2 * (math.sqrt(2) if shape == 'triangle' else 1.0)
+        self.radius = int(math.ceil(outer_radius)) + 2
+        self.sprite_size = 2 * self.radius + 1
+
+        # Quantize rotation so the outermost vertex moves at most one subpixel step per angle step
+        self.symmetry = SHAPE_SYMMETRY[shape]
+        max_step = math.degrees(1.0 / (subpixel_steps * max(outer_radius, 1.0)))
+        self.angle_steps = int(math.ceil(self.symmetry / min(max_step, 1.0)))
+        self.angle_step = self.symmetry / self.angle_steps
+
+        self.sprites = OrderedDict()
+        self.cached_bytes = 0
+        # Frames may be stamped from several threads at once
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def quantize(self, x, y, rotation):
+        """
+        Split position and rotation arrays into integer pixels, subpixel phases and
+        rotation indices, returned as int64 arrays (ix, iy, phase_x, phase_y, angle_index).
+        """
+        ix = np.floor(x)
+        iy = np.floor(y)
+        phase_x = np.rint((x - ix) * self.subpixel_steps)
+        phase_y = np.rint((y - iy) * self.subpixel_steps)
+        # A phase that rounds up to a full pixel moves to the next pixel
+        ix = ix + (phase_x == self.subpixel_steps)
+        iy = iy + (phase_y == self.subpixel_steps)
+        phase_x = phase_x % self.subpixel_steps
+        phase_y = phase_y % self.subpixel_steps
+        angle_index = np.rint((rotation % self.symmetry) / self.angle_step) % self.angle_steps
+        return tuple(v.astype(np.int64) for v in (ix, iy, phase_x, phase_y, angle_index))
+
+    def fits(self, positions, rotations, visible):
+        """
+        Check whether every sprite needed for a render fits in the memory budget.
+        When it doesn't, the atlas would thrash and direct drawing is cheaper.
+
+        Args:
+            positions: (F, P, 2) shape centers
+            rotations: (F, P) rotations in degrees
+            visible: (F, P) visibility table
+        """
+        centers = positions[visible]
+        _, _, phase_x, phase_y, angle_index = self.quantize(centers[:, 0], centers[:, 1], rotations[visible])
+        keys = (angle_index * self.subpixel_steps + phase_x) * self.subpixel_steps + phase_y
+        sprite_bytes = self.sprite_size * self.sprite_size * 2
+        return len(np.unique(keys)) * sprite_bytes <= self.max_bytes
+
+    def rasterize(self, angle_index, phase_x, phase_y):
+        """
+        Draw one sprite.
+
+        Returns:
+            (left, top, values, alpha): offset of the cropped sprite inside the S x S window,
+            its (h, w) uint8 values and (h, w) bool coverage
+        """
+        center_x = self.radius + phase_x / self.subpixel_steps
+        center_y = self.radius + phase_y / self.subpixel_steps
+        rotation = angle_index * self.angle_step
+        size = (self.sprite_size, self.sprite_size)
+
+        coverage = Image.new("L", size, 0)
+        self.draw_shape(ImageDraw.Draw(coverage), self.shape, center_x, center_y, self.shape_size,
+                        rotation, 255, self.border_width, 255)
+
+        # Keep only the covered part of the sprite and remember where it sits in the window
+        bbox = coverage.getbbox()
+        if bbox is None:
+            return 0, 0, np.zeros((0, 0), dtype=np.uint8), np.zeros((0, 0), dtype=bool)
+
+        values = Image.new("L", size, 0)
+        self.draw_shape(ImageDraw.Draw(values), self.shape, center_x, center_y, self.shape_size,
+                        rotation, self.fill_value, self.border_width, self.border_value)
+
+        alpha = np.asarray(coverage.crop(bbox)) > 0
+        return bbox[0], bbox[1], np.asarray(values.crop(bbox)), alpha
+
+    def get(self, angle_index, phase_x, phase_y):
+        """Return the cached sprite for a quantized rotation and subpixel phase, rasterizing on a miss"""
+        key = (angle_index, phase_x, phase_y)
+        with self.lock:
+            sprite = self.sprites.get(key)
+            if sprite is not None:
+                self.sprites.move_to_end(key)
+                return sprite
+
+            sprite = self.rasterize(*key)
+            self.sprites[key] = sprite
+            self.cached_bytes += sprite[2].nbytes + sprite[3].nbytes
+            while self.cached_bytes > self.max_bytes and len(self.sprites) > 1:
+                _, (_, _, old_values, old_alpha) = self.sprites.popitem(last=False)
+                self.cached_bytes -= old_values.nbytes + old_alpha.nbytes
+            return sprite
+
+    def stamp(self, canvas, ix, iy, phase_x, phase_y, angle_index):
+        """Alpha-blit one quantized shape (see quantize) into an (H, W) uint8 canvas in place"""
+        offset_x, offset_y, values, alpha = self.get(angle_index, phase_x, phase_y)
+
+        left = ix - self.radius + offset_x
+        top = iy - self.radius + offset_y
+        sprite_height, sprite_width = alpha.shape
+        height, width = canvas.shape[:2]
+        x0, y0 = max(left, 0), max(top, 0)
+        x1 = min(left + sprite_width, width)
+        y1 = min(top + sprite_height, height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        sx, sy = x0 - left, y0 - top
+        np.copyto(canvas[y0:y1, x0:x1],
+                  values[sy:sy + y1 - y0, sx:sx + x1 - x0],
+                  where=alpha[sy:sy + y1 - y0, sx:sx + x1 - x0])
@@ -0,0 +1,210 @@
+"""
+Seeded synthetic paths_data for the FL Path Animator.
+
+Builds formatVersion 2 documents with the same schema the path editor saves:
+pencil strokes, orbits and arcs (with their generationParams, so the editor can
+regenerate them) and single-point pins, with mixed startTime / endTime,
+interpolation and visibilityMode. orbit_points and arc_points are the Python
+equivalents of the editor's generateEllipsePoints (OrbitTool.js) and
+generateArcPoints (ArcTool.js).
+
+The same seed always gives the same document, so benchmarks and equivalence
+checks can regenerate their workloads instead of storing them. The
+FL_SyntheticPaths node exposes the generator as a procedural paths_data input.
+"""
+
+import json
+import math
+import random
+
+PATH_KINDS = ('pencil', 'orbit', 'arc', 'pin')
+INTERPOLATIONS = ('linear', 'ease-in', 'ease-out', 'ease-in-out')
+VISIBILITY_MODES = ('pop', 'static')
+# The editor's getRandomColor palette
+PATH_COLORS = ('#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F', '#BB8FCE', '#85C1E2')
+# Minimum spacing of pencil points, as the editor records them (canvas pixels)
+PENCIL_SPACING = 3.0
+
+
+def orbit_points(center, rx, ry, end_point, direction='cw', num_points=20):
+    """
+    Points of an orbit as OrbitTool.js generateEllipsePoints makes them: num_points
+    points around the ellipse starting at the angle of end_point, plus the first
+    point again to close the loop.
+    """
+    if rx == 0 and ry == 0:
+        return []
+    start_angle = math.atan2(end_point['y'] - center['y'], end_point['x'] - center['x'])
+    angle_step = 2 * math.pi / num_points
+    direction_multiplier = 1 if direction == 'cw' else -1
+
+    points = []
+    for i in range(num_points):
+        angle = start_angle + i * angle_step * direction_multiplier
+        points.append({'x': center['x'] + rx * math.cos(angle), 'y': center['y'] + ry * math.sin(angle)})
+    points.append(dict(points[0]))
+    return points
+
+
+def arc_points(start, end, direction='up', num_points=20):
+    """
+    Points of an arc as ArcTool.js generateArcPoints makes them: num_points + 1
+    points along the half circle over the start-end baseline.
+    """
+    midpoint = {'x': (start['x'] + end['x']) / 2, 'y': (start['y'] + end['y']) / 2}
+    radius = math.hypot(end['x'] - start['x'], end['y'] - start['y']) / 2
+    if radius == 0:
+        return []
+    start_angle = math.atan2(start['y'] - midpoint['y'], start['x'] - midpoint['x'])
+    angle_step = math.pi / num_points
+    direction_multiplier = -1 if direction == 'up' else 1
+
+    return [{'x': midpoint['x'] + radius * math.cos(start_angle + i * angle_step * direction_multiplier),
+             'y': midpoint['y'] + radius * math.sin(start_angle + i * angle_step * direction_multiplier)}
+            for i in range(num_points + 1)]
+
+
+def pencil_points(rng, width, height, num_points):
+    """
+    A freehand stroke of num_points points: a smoothly turning walk with steps of a
+    few pixels (wider than the editor's PENCIL_SPACING), kept on the canvas by
+    turning back at the edges.
+    """
+    x, y = rng.uniform(0.1, 0.9) * width, rng.uniform(0.1, 0.9) * height
+    heading = rng.uniform(0, 2 * math.pi)
+    turn = 0.0
+    points = [{'x': x, 'y': y}]
+    for _ in range(num_points - 1):
+        turn = 0.8 * turn + rng.gauss(0, 0.08)
+        heading += turn
+        step = rng.uniform(PENCIL_SPACING + 0.5, 3 * PENCIL_SPACING)
+        nx, ny = x + step * math.cos(heading), y + step * math.sin(heading)
+        if not (0 <= nx <= width and 0 <= ny <= height):
+            # Head back towards the middle of the canvas
+            heading = math.atan2(height / 2 - y, width / 2 - x) + rng.uniform(-0.5, 0.5)
+            nx, ny = x + step * math.cos(heading), y + step * math.sin(heading)
+        x, y = min(max(nx, 0.0), width), min(max(ny, 0.0), height)
+        points.append({'x': x, 'y': y})
+    return points
+
+
+def random_timing(rng):
+    """Editor timing fields: a random window, easing and visibility mode"""
+    start, end = sorted((round(rng.uniform(0.0, 1.0), 3), round(rng.uniform(0.0, 1.0), 3)))
+    if end - start < 0.05:
+        start, end = 0.0, 1.0
+    return {
+        'startTime': start,
+        'endTime': end,
+        'interpolation': rng.choice(INTERPOLATIONS),
+        'visibilityMode': rng.choice(VISIBILITY_MODES),
+    }
+
+
+def make_path(rng, kind, index, width, height, num_points):
+    """One editor path of the given kind, with the fields the editor's tool would set"""
+    path = {
+        'id': f'path_{index}',
+        'name': f'{kind.capitalize()} {index + 1}',
+        'color': rng.choice(PATH_COLORS),
+        'isSinglePoint': kind == 'pin',
+    }
+    if kind == 'pin':
+        path['points'] = [{'x': round(rng.uniform(0, width)), 'y': round(rng.uniform(0, height))}]
+    elif kind == 'pencil':
+        path['points'] = pencil_points(rng, width, height, max(num_points, 2))
+    elif kind == 'orbit':
+        center = {'x': rng.uniform(0.2, 0.8) * width, 'y': rng.uniform(0.2, 0.8) * height}
+        end_point = {'x': center['x'] + rng.uniform(-0.2, 0.2) * width,
+                     'y': center['y'] + rng.uniform(-0.2, 0.2) * height}
+        state = {'center': center, 'rx': max(abs(end_point['x'] - center['x']), 6.0),
+                 'ry': max(abs(end_point['y'] - center['y']), 6.0), 'endPoint': end_point}
+        direction = rng.choice(('cw', 'ccw'))
+        # The closing point repeats the first
+        point_count = max(num_points - 1, 3)
+        path['points'] = orbit_points(center, state['rx'], state['ry'], end_point, direction, point_count)
+        path['direction'] = direction
+        path['generationParams'] = {'type': 'orbit', 'state': state, 'numPoints': point_count}
+    elif kind == 'arc':
+        start = {'x': rng.uniform(0.1, 0.9) * width, 'y': rng.uniform(0.1, 0.9) * height}
+        end = {'x': rng.uniform(0.1, 0.9) * width, 'y': rng.uniform(0.1, 0.9) * height}
+        if math.hypot(end['x'] - start['x'], end['y'] - start['y']) <= 10:
+            end = {'x': start['x'] + 20.0, 'y': start['y']}
+        arc_direction = rng.choice(('up', 'down'))
+        # The arc includes both ends of its baseline
+        point_count = max(num_points - 1, 2)
+        path['points'] = arc_points(start, end, arc_direction, point_count)
+        path['direction'] = 'cw' if arc_direction == 'up' else 'ccw'
+        path['generationParams'] = {'type': 'arc', 'state': {'start': start, 'end': end}, 'numPoints': point_count}
+    else:
+        raise ValueError(f"Unknown path kind {kind!r}, expected one of {PATH_KINDS}")
+
+    path.update(random_timing(rng))
+    return path
+
+
+def generate_paths(seed=0, width=512, height=512, num_paths=16, points_per_path=64, kinds=PATH_KINDS,
+                   mixed_timing=True):
+    """
+    Build a seeded paths_data document.
+
+    Args:
+        seed: Random seed, the same seed gives the same document
+        width, height: Editor canvas size
+        num_paths: Number of paths
+        points_per_path: Points of every pencil stroke, orbit and arc (pins have one)
+        kinds: Path kinds to draw from PATH_KINDS, used in turn
+        mixed_timing: Random startTime / endTime, interpolation and visibilityMode per
+            path; otherwise every path runs the whole timeline, linear and 'pop'
+
+    Returns:
+        formatVersion 2 paths_data dict
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(num_paths):
+        path = make_path(rng, kinds[index % len(kinds)], index, width, height, points_per_path)
+        if not mixed_timing:
+            path.update(startTime=0.0, endTime=1.0, interpolation='linear', visibilityMode='pop')
+        paths.append(path)
+    return {'formatVersion': 2, 'paths': paths, 'canvas_size': {'width': width, 'height': height}}
+
+
+def generate_paths_data(*args, **kwargs):
+    """generate_paths as the JSON string the node's paths_data input takes"""
+    return json.dumps(generate_paths(*args, **kwargs))
+
+
+class FL_SyntheticPaths:
+    """Procedural paths_data source, for stress tests and reproducible workloads"""
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("paths_data",)
+    FUNCTION = "generate"
+    CATEGORY = "🎨 FL Path Animator"
+    DESCRIPTION = """
+Generates seeded paths_data in the path editor's format: pencil strokes, orbits, arcs and pins
+with mixed timing and visibility. Connect it to FL Path Animator's paths_data input.
+"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "step": 1}),
+                "canvas_width": ("INT", {"default": 512, "min": 64, "max": 4096, "step": 1}),
+                "canvas_height": ("INT", {"default": 512, "min": 64, "max": 4096, "step": 1}),
+                "num_paths": ("INT", {"default": 16, "min": 1, "max": 10000, "step": 1}),
+                "points_per_path": ("INT", {"default": 64, "min": 2, "max": 100000, "step": 1}),
+                # mixed: every kind in turn, or a single kind
+                "path_kinds": (['mixed', *PATH_KINDS], {"default": 'mixed'}),
+                # Random start/end times, easing and visibility per path
+                "mixed_timing": ("BOOLEAN", {"default": True}),
+            },
+        }
+
+    def generate(self, seed, canvas_width, canvas_height, num_paths, points_per_path, path_kinds='mixed',
+                 mixed_timing=True):
+        kinds = PATH_KINDS if path_kinds == 'mixed' else (path_kinds,)
+        return (generate_paths_data(seed, canvas_width, canvas_height, num_paths, points_per_path, kinds,
+                                    mixed_timing),)